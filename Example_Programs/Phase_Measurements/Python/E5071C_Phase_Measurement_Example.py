@@ -4,7 +4,8 @@ import datetime
 import pandas as pd
 
 from socHACKi.socHACKiInstrumentControlPackage import AgilentNetworkAnalyzer
-from socHACKi.socHACKiUtilityPackage import ExcelHandler as xlh
+from socHACKi.socHACKiMeasurementAnalysisPackage import PhaseStabilityAnalyzer
+from socHACKi.socHACKiUtilityPackage import ExcelWriterSession
 
 import matplotlib.pyplot as plt
 
@@ -34,6 +35,7 @@ PLOT_FREQUENCIES.extend([float(x) for x in range(1000000000, 21000000000, 100000
 RESULTS_FILE_PATH = 'Z:\\path\\to\\your\\desired\\folder'
 FILE_NAME = 'Desired_Name_Of_File.xlsx'
 SHEET_NAME = 'Column_Header_Is_Frequency_Hz'
+ALL_FREQUENCIES_SHEET_NAME = 'All_Frequencies_Hz'
 START_COLUMN = 1
 # %%
 # Initialize the instrument and make the COM
@@ -100,12 +102,23 @@ plt.title('Phase Change vs Time')
 plt.grid(True)
 plt.show()
 # %%
+# Phase stability of every frequency point
+tau, allan_deviation = PhaseStabilityAnalyzer.allan_deviation_of(
+    cumulative_phase_df, MEASUREMENT_TIME_STEP_IN_SECONDS,
+    frequency=S['frequency'])
+phase_drift_rate = PhaseStabilityAnalyzer.drift_rate_of(
+    cumulative_phase_df, time_vector)
+# %%
 
-# Save to excel file
-xlh.save_to_excel(reduced_set_cumulative_phase_delta_df,
-                  RESULTS_FILE_PATH,
-                  FILE_NAME,
-                  SHEET_NAME,
-                  START_COLUMN)
+# Save to excel file, the reduced set and every frequency point go into the
+# same workbook
+with ExcelWriterSession(RESULTS_FILE_PATH, FILE_NAME) as xl_session:
+    xl_session.write_frame(reduced_set_cumulative_phase_delta_df,
+                           SHEET_NAME,
+                           start_row=1,
+                           start_column=START_COLUMN,
+                           index_label='')
+    xl_session.write_frame(cumulative_phase_df,
+                           ALL_FREQUENCIES_SHEET_NAME)
 # %%
 na.disconnect()
@@ -12,6 +12,6 @@ setup(
     author_email='johnsochacki@hotmail.com',
     url='https://github.com/jsochacki',
     packages = find_packages(exclude=['*test*']),
-    install_requires=['pandas>=0.18.1', 'tabulate', 'comtypes>=1.1.2'],
+    install_requires=['numpy', 'pandas>=0.18.1', 'tabulate', 'xlsxwriter', 'comtypes>=1.1.2'],
     keywords = ['Type Conversion', 'Pandas', 'Visio', 'Instrument Control'],
 )
@@ -3,6 +3,7 @@ __all__ = ["socHACKiCommunicationsPackage",
            "socHACKiImageProcessingPackage",
            "socHACKiInstrumentControlPackage",
            "socHACKiMathPackage",
+           "socHACKiMeasurementAnalysisPackage",
            "socHACKiSignalProcessingPackage",
            "socHACKiTypeConversionPackage",
            "socHACKiUtilityPackage"]
@@ -0,0 +1,999 @@
+"""
+Author: John Sochacki
+This module is a collection of host side analysis classes for data captured
+from test equiptment.  Everything here works on whole stacks of captured
+sweeps at once with numpy so that long captures never have to go back to
+the instrument for post processing.
+"""
+from collections import deque
+
+import numpy as np
+
+from socHACKi.socHACKiUtilityPackage import AttrDict
+
+
+class AgilentNALimitTest(object):
+    """
+    This is a host side limit line tester that mirrors the limit tables of
+    the agilent network analyzers.
+
+    Limit segments are piecewise linear and are compiled onto the frequency
+    grid once when they are added.  After that any number of sweeps can be
+    checked against the compiled mask in a single vectorized pass.
+
+    Parameters
+    ----------
+    frequency : array like
+                The stimulus (frequency) grid that the traces are taken on.
+
+    Example
+    -------
+    >>> limit_test = AgilentNALimitTest(S['frequency'])
+    >>> limit_test.add_segment(
+    ...     AgilentNALimitTest.AgilentNALimitTypeEnum.AgilentNALimitTypeMaximum,
+    ...     1e9, 20e9, -10, -12)
+    >>> limit_test.add_segment(
+    ...     AgilentNALimitTest.AgilentNALimitTypeEnum.AgilentNALimitTypeMinimum,
+    ...     1e9, 20e9, -30, -30)
+    >>> result = limit_test.evaluate(cumulative_logmag_df)
+    >>> result.passed
+    array([ True,  True, False, ...])
+    >>> result.first_fail_sweep
+    2
+
+    Warning
+    -------
+    Segments of the same type that overlap are combined the same way the
+    instrument does it, the tightest limit at each point wins.
+    """
+    AgilentNALimitTypeEnum = AttrDict(
+        {
+         'AgilentNALimitTypeOff': 0,
+         'AgilentNALimitTypeMaximum': 1,
+         'AgilentNALimitTypeMinimum': 2
+         })
+
+    def __init__(self, frequency):
+        self._frequency = np.asarray(frequency, dtype=float)
+        self._segments = []
+        self.reset()
+
+    @property
+    def frequency(self):
+        return self._frequency
+
+    @property
+    def segments(self):
+        return self._segments
+
+    @property
+    def upper_limit(self):
+        return self._upper_limit
+
+    @property
+    def lower_limit(self):
+        return self._lower_limit
+
+    def reset(self):
+        self._segments = []
+        self._upper_limit = np.full(self._frequency.shape, np.inf)
+        self._lower_limit = np.full(self._frequency.shape, -np.inf)
+
+    def add_segment(self, limit_type, f_start, f_stop,
+                    value_start, value_stop):
+        """
+        Compiles one piecewise linear limit segment onto the frequency grid.
+
+        Parameters
+        ----------
+            limit_type : int
+                         One of the AgilentNALimitTypeEnum values
+            f_start : float
+                      Start stimulus of the segment
+            f_stop : float
+                     Stop stimulus of the segment
+            value_start : float
+                          Limit value at f_start
+            value_stop : float
+                         Limit value at f_stop
+        """
+        if limit_type not in self.AgilentNALimitTypeEnum.values():
+            raise ValueError('Unknown limit type {}, expected one of '
+                             'the AgilentNALimitTypeEnum values'.format(
+                                 limit_type))
+        self._segments.append((limit_type, float(f_start), float(f_stop),
+                               float(value_start), float(value_stop)))
+        if limit_type == \
+                self.AgilentNALimitTypeEnum.AgilentNALimitTypeOff:
+            return
+
+        in_segment = ((self._frequency >= min(f_start, f_stop)) &
+                      (self._frequency <= max(f_start, f_stop)))
+        if f_start == f_stop:
+            values = np.full(self._frequency.shape, float(value_start))
+        elif f_start < f_stop:
+            values = np.interp(self._frequency,
+                               [f_start, f_stop], [value_start, value_stop])
+        else:
+            values = np.interp(self._frequency,
+                               [f_stop, f_start], [value_stop, value_start])
+
+        if limit_type == \
+                self.AgilentNALimitTypeEnum.AgilentNALimitTypeMaximum:
+            self._upper_limit = np.where(
+                in_segment,
+                np.minimum(self._upper_limit, values),
+                self._upper_limit)
+        else:
+            self._lower_limit = np.where(
+                in_segment,
+                np.maximum(self._lower_limit, values),
+                self._lower_limit)
+
+    @classmethod
+    def from_segments(cls, frequency, segments):
+        """
+        Builds a limit test from a list of
+        (limit_type, f_start, f_stop, value_start, value_stop) tuples.
+        """
+        limit_test = cls(frequency)
+        for segment in segments:
+            limit_test.add_segment(*segment)
+        return limit_test
+
+    def margin(self, traces, frequency_axis=-1):
+        """
+        Returns the margin to the closest limit at every point of every trace.
+        Positive margin passes, negative margin fails and points without any
+        limit have a margin of inf.
+        """
+        traces = np.moveaxis(np.asarray(traces, dtype=float),
+                             frequency_axis, -1)
+        if traces.shape[-1] != self._frequency.size:
+            raise ValueError('Traces have {} points along the frequency axis '
+                             'but the limit was compiled for {}'.format(
+                                 traces.shape[-1], self._frequency.size))
+        return np.moveaxis(np.minimum(self._upper_limit - traces,
+                                      traces - self._lower_limit),
+                           -1, frequency_axis)
+
+    def evaluate(self, traces, frequency_axis=-1, sweep_axis=0):
+        """
+        Checks a whole batch of sweeps against the compiled limit mask.
+
+        Parameters
+        ----------
+            traces : array like
+                     Any stack of traces, e.g. time x frequency or
+                     time x frequency x trace.  A DataFrame laid out like the
+                     cumulative_phase_df from take_phase_vs_time_measurement
+                     works as is.
+            frequency_axis : int
+                             The axis that runs along the frequency grid
+            sweep_axis : int
+                         The axis that runs across sweeps (time), this is the
+                         axis that first_fail_sweep is reported along.
+
+        Returns
+        -------
+            AttrDict with
+                margin : numpy.ndarray
+                         Same shape as traces
+                worst_margin : numpy.ndarray
+                               Smallest margin of each trace
+                passed : numpy.ndarray (bool)
+                         Pass/fail of each trace
+                first_fail_point : numpy.ndarray (int)
+                                   Frequency index of the first failing point
+                                   of each trace, -1 if the trace passed
+                first_fail_sweep : numpy.ndarray (int)
+                                   Index of the first failing sweep,
+                                   -1 if every sweep passed
+        """
+        margin = self.margin(traces, frequency_axis)
+        ndim = margin.ndim
+        frequency_axis = frequency_axis % ndim
+        sweep_axis = sweep_axis % ndim
+        failing = margin < 0
+
+        worst_margin = margin.min(axis=frequency_axis)
+        passed = ~failing.any(axis=frequency_axis)
+        first_fail_point = np.where(passed,
+                                    -1,
+                                    failing.argmax(axis=frequency_axis))
+
+        if sweep_axis == frequency_axis:
+            first_fail_sweep = first_fail_point
+        else:
+            reduced_sweep_axis = \
+                sweep_axis - 1 if sweep_axis > frequency_axis else sweep_axis
+            first_fail_sweep = np.where(
+                passed.all(axis=reduced_sweep_axis),
+                -1,
+                (~passed).argmax(axis=reduced_sweep_axis))
+
+        return AttrDict({'margin': margin,
+                         'worst_margin': worst_margin,
+                         'passed': passed,
+                         'first_fail_point': first_fail_point,
+                         'first_fail_sweep': first_fail_sweep})
+
+
+class AgilentNAMarkerSearch(object):
+    """
+    This is a host side marker search engine that mirrors the marker search
+    functions of the agilent network analyzers.
+
+    Every search runs over an entire stack of traces at once so pulling
+    marker values out of a long capture does not need an instrument round
+    trip per marker per trace.  Target searches interpolate the crossing
+    between the two points that straddle the target value.
+
+    Parameters
+    ----------
+    frequency : array like
+                The stimulus (frequency) grid that the traces are taken on.
+
+    Example
+    -------
+    >>> marker_search = AgilentNAMarkerSearch(S['frequency'])
+    >>> markers = marker_search.search(
+    ...     cumulative_logmag_df,
+    ...     AgilentNAMarkerSearch.AgilentNAMarkerSearchTypeEnum
+    ...                         .AgilentNAMarkerSearchTypeMax)
+    >>> markers.stimulus
+    array([1.2e+10, 1.2e+10, ...])
+    >>> markers = marker_search.search(
+    ...     cumulative_logmag_df,
+    ...     AgilentNAMarkerSearch.AgilentNAMarkerSearchTypeEnum
+    ...                         .AgilentNAMarkerSearchTypeTargetRight,
+    ...     target=-3,
+    ...     reference_index=markers.index)
+
+    Warning
+    -------
+    Searches that find nothing return an index of -1 and a stimulus and
+    response of nan for that trace.
+    """
+    AgilentNAMarkerSearchTypeEnum = AttrDict(
+        {
+         'AgilentNAMarkerSearchTypeTarget': 0,
+         'AgilentNAMarkerSearchTypeTargetLeft': 1,
+         'AgilentNAMarkerSearchTypeTargetRight': 2,
+         'AgilentNAMarkerSearchTypeMax': 3,
+         'AgilentNAMarkerSearchTypeMin': 4,
+         'AgilentNAMarkerSearchTypePeak': 5,
+         'AgilentNAMarkerSearchTypePeakLeft': 6,
+         'AgilentNAMarkerSearchTypePeakRight': 7
+         })
+
+    def __init__(self, frequency):
+        self._frequency = np.asarray(frequency, dtype=float)
+
+    @property
+    def frequency(self):
+        return self._frequency
+
+    def search(self, traces, search_type, target=None, reference_index=0,
+               peak_excursion=0.0, frequency_axis=-1):
+        """
+        Runs one marker search over every trace in the stack.
+
+        Parameters
+        ----------
+            traces : array like
+                     Any stack of traces, e.g. time x frequency or
+                     time x frequency x trace
+            search_type : int
+                          One of the AgilentNAMarkerSearchTypeEnum values
+            target : float
+                     The target value, required for the target searches
+            reference_index : int or array like
+                              The point index the left/right searches start
+                              from (the current marker position), either one
+                              index for every trace or one per trace.  The
+                              plain target search returns the crossing
+                              closest to it.
+            peak_excursion : float
+                             How far a local maximum has to rise above both
+                             of its neighbours to count as a peak
+            frequency_axis : int
+                             The axis that runs along the frequency grid
+
+        Returns
+        -------
+            AttrDict with
+                index : numpy.ndarray (int)
+                        Point index of the marker (the point to the left of
+                        the crossing for target searches), -1 if not found
+                stimulus : numpy.ndarray
+                           Marker stimulus, interpolated for target searches
+                response : numpy.ndarray
+                           Marker response value
+                found : numpy.ndarray (bool)
+        """
+        traces = np.moveaxis(np.asarray(traces, dtype=float),
+                             frequency_axis, -1)
+        if traces.shape[-1] != self._frequency.size:
+            raise ValueError('Traces have {} points along the frequency axis '
+                             'but the search grid has {}'.format(
+                                 traces.shape[-1], self._frequency.size))
+        reference_index = np.broadcast_to(
+            np.asarray(reference_index, dtype=int), traces.shape[:-1])
+        enum = self.AgilentNAMarkerSearchTypeEnum
+
+        if search_type == enum.AgilentNAMarkerSearchTypeMax:
+            return self._point_result(traces, traces.argmax(axis=-1))
+        elif search_type == enum.AgilentNAMarkerSearchTypeMin:
+            return self._point_result(traces, traces.argmin(axis=-1))
+        elif search_type in (enum.AgilentNAMarkerSearchTypePeak,
+                             enum.AgilentNAMarkerSearchTypePeakLeft,
+                             enum.AgilentNAMarkerSearchTypePeakRight):
+            peaks = self.local_peaks(traces, peak_excursion)
+            if search_type == enum.AgilentNAMarkerSearchTypePeak:
+                found = peaks.any(axis=-1)
+                index = np.where(peaks, traces, -np.inf).argmax(axis=-1)
+            elif search_type == enum.AgilentNAMarkerSearchTypePeakLeft:
+                found, index = self._nearest(peaks, reference_index, 'left')
+            else:
+                found, index = self._nearest(peaks, reference_index, 'right')
+            return self._point_result(traces, index, found)
+        elif search_type in (enum.AgilentNAMarkerSearchTypeTarget,
+                             enum.AgilentNAMarkerSearchTypeTargetLeft,
+                             enum.AgilentNAMarkerSearchTypeTargetRight):
+            if target is None:
+                raise ValueError('Target searches require a target value')
+            return self._target_result(traces, float(target),
+                                       reference_index, search_type)
+        else:
+            raise ValueError('Unknown search type {}, expected one of '
+                             'the AgilentNAMarkerSearchTypeEnum values'.format(
+                                 search_type))
+
+    @staticmethod
+    def local_peaks(traces, peak_excursion=0.0):
+        """
+        Returns a boolean mask of the points that are higher than both of
+        their neighbours by at least peak_excursion.  End points are never
+        peaks, the same as on the instrument.
+        """
+        traces = np.asarray(traces, dtype=float)
+        peaks = np.zeros(traces.shape, dtype=bool)
+        peaks[..., 1:-1] = \
+            ((traces[..., 1:-1] - traces[..., :-2] > peak_excursion) &
+             (traces[..., 1:-1] - traces[..., 2:] > peak_excursion))
+        return peaks
+
+    @staticmethod
+    def _nearest(mask, reference_index, direction):
+        # Finds the nearest True of mask strictly left of or at/right of the
+        # reference index for every trace at once
+        positions = np.arange(mask.shape[-1])
+        if direction == 'left':
+            candidates = mask & (positions < reference_index[..., None])
+            found = candidates.any(axis=-1)
+            index = mask.shape[-1] - 1 - candidates[..., ::-1].argmax(axis=-1)
+        else:
+            candidates = mask & (positions > reference_index[..., None])
+            found = candidates.any(axis=-1)
+            index = candidates.argmax(axis=-1)
+        return found, np.where(found, index, -1)
+
+    def _point_result(self, traces, index, found=None):
+        if found is None:
+            found = np.ones(index.shape, dtype=bool)
+        index = np.where(found, index, -1)
+        safe_index = np.where(found, index, 0)
+        response = np.take_along_axis(traces, safe_index[..., None],
+                                      axis=-1)[..., 0]
+        return AttrDict({'index': index,
+                         'stimulus': np.where(
+                             found, self._frequency[safe_index], np.nan),
+                         'response': np.where(found, response, np.nan),
+                         'found': found})
+
+    def _target_result(self, traces, target, reference_index, search_type):
+        enum = self.AgilentNAMarkerSearchTypeEnum
+        below = traces[..., :-1] - target
+        above = traces[..., 1:] - target
+        # A crossing lives on the segment between point i and point i + 1
+        crossings = ((below <= 0) & (above > 0)) | ((below >= 0) & (above < 0))
+
+        if search_type == enum.AgilentNAMarkerSearchTypeTargetLeft:
+            found, index = self._nearest(crossings, reference_index, 'left')
+        elif search_type == enum.AgilentNAMarkerSearchTypeTargetRight:
+            found, index = self._nearest(crossings, reference_index - 1,
+                                         'right')
+        else:
+            segments = np.arange(crossings.shape[-1])
+            distance = np.where(crossings,
+                                np.abs(segments - reference_index[..., None]),
+                                crossings.shape[-1] + 1)
+            found = crossings.any(axis=-1)
+            index = np.where(found, distance.argmin(axis=-1), -1)
+
+        safe_index = np.where(found, index, 0)
+        y_left = np.take_along_axis(traces, safe_index[..., None],
+                                    axis=-1)[..., 0]
+        y_right = np.take_along_axis(traces, safe_index[..., None] + 1,
+                                     axis=-1)[..., 0]
+        f_left = self._frequency[safe_index]
+        f_right = self._frequency[safe_index + 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(y_right != y_left,
+                                (target - y_left) / (y_right - y_left),
+                                0.0)
+        return AttrDict({'index': index,
+                         'stimulus': np.where(
+                             found, f_left + fraction * (f_right - f_left),
+                             np.nan),
+                         'response': np.where(found, target, np.nan),
+                         'found': found})
+
+
+class AgilentNATraceMath(object):
+    """
+    This is a host side implementation of the trace math and trace
+    statistics functions of the agilent network analyzers.
+
+    Trace math is applied against a stored memory trace, the same as the
+    data -> memory function on the instrument, and the statistics can be
+    taken over any frequency span along either axis of a
+    time x frequency array.
+
+    Parameters
+    ----------
+    frequency : array like
+                The stimulus (frequency) grid that the traces are taken on.
+                Only needed if statistics are taken over frequency spans.
+
+    Example
+    -------
+    >>> trace_math = AgilentNATraceMath(S['frequency'])
+    >>> trace_math.memory = cumulative_phase_df.iloc[0]
+    >>> phase_delta = trace_math.apply(
+    ...     cumulative_phase_df,
+    ...     AgilentNATraceMath.AgilentNAMeasurementTraceMathEnum
+    ...                       .AgilentNAMeasurementTraceMathSubtracted)
+    >>> trace_math.statistic(
+    ...     phase_delta,
+    ...     AgilentNATraceMath.AgilentNAMeasurementStatisticTypeEnum
+    ...                       .AgilentNAMeasurementStatisticTypePeakToPeak,
+    ...     axis=0,
+    ...     frequency_span=(1e9, 2e9))
+    array([0.12, 0.13, ...])
+
+    Warning
+    -------
+    The standard deviation is the population standard deviation, the same
+    as the instrument reports.
+    """
+    AgilentNAMeasurementTraceMathEnum = AttrDict(
+        {
+         'AgilentNAMeasurementTraceMathNone': 0,
+         'AgilentNAMeasurementTraceMathDivided': 1,
+         'AgilentNAMeasurementTraceMathMultiplied': 2,
+         'AgilentNAMeasurementTraceMathSubtracted': 3,
+         'AgilentNAMeasurementTraceMathAdded': 4
+         })
+    AgilentNAMeasurementStatisticTypeEnum = AttrDict(
+        {
+         'AgilentNAMeasurementStatisticTypeMean': 0,
+         'AgilentNAMeasurementStatisticTypeStandardDeviation': 1,
+         'AgilentNAMeasurementStatisticTypePeakToPeak': 2
+         })
+
+    def __init__(self, frequency=None):
+        if frequency is None:
+            self._frequency = None
+        else:
+            self._frequency = np.asarray(frequency, dtype=float)
+        self._memory = None
+
+    @property
+    def frequency(self):
+        return self._frequency
+
+    @property
+    def memory(self):
+        return self._memory
+
+    @memory.setter
+    def memory(self, trace):
+        self._memory = np.array(trace, dtype=float)
+
+    @memory.deleter
+    def memory(self):
+        self._memory = None
+
+    def apply(self, traces, trace_math, frequency_axis=-1):
+        """
+        Applies trace math between every trace in the stack and the memory
+        trace.  A one dimensional memory trace is lined up with the frequency
+        axis, otherwise the memory has to broadcast against the traces.
+        """
+        enum = self.AgilentNAMeasurementTraceMathEnum
+        traces = np.asarray(traces, dtype=float)
+        if trace_math == enum.AgilentNAMeasurementTraceMathNone:
+            return traces
+        if self._memory is None:
+            raise ValueError('No memory trace is stored, set memory first')
+
+        memory = self._memory
+        if memory.ndim == 1 and traces.ndim > 1:
+            shape = [1] * traces.ndim
+            shape[frequency_axis] = memory.size
+            memory = memory.reshape(shape)
+
+        if trace_math == enum.AgilentNAMeasurementTraceMathDivided:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return traces / memory
+        elif trace_math == enum.AgilentNAMeasurementTraceMathMultiplied:
+            return traces * memory
+        elif trace_math == enum.AgilentNAMeasurementTraceMathSubtracted:
+            return traces - memory
+        elif trace_math == enum.AgilentNAMeasurementTraceMathAdded:
+            return traces + memory
+        else:
+            raise ValueError('Unknown trace math {}, expected one of the '
+                             'AgilentNAMeasurementTraceMathEnum '
+                             'values'.format(trace_math))
+
+    def statistic(self, traces, statistic_type, axis=-1,
+                  frequency_span=None, frequency_axis=-1):
+        """
+        Computes one trace statistic along either axis of a stack of traces.
+
+        Parameters
+        ----------
+            traces : array like
+                     Any stack of traces, e.g. time x frequency
+            statistic_type : int
+                             One of the AgilentNAMeasurementStatisticTypeEnum
+                             values
+            axis : int
+                   The axis the statistic is taken along.  Use the frequency
+                   axis for per sweep statistics and the time axis for per
+                   frequency point statistics over the capture.
+            frequency_span : tuple or list of tuples
+                             (f_start, f_stop) span(s) to restrict the
+                             frequency axis to.  A list of spans stacks the
+                             results along a new last axis.
+            frequency_axis : int
+                             The axis that runs along the frequency grid
+        """
+        traces = np.asarray(traces, dtype=float)
+        if frequency_span is None:
+            return self._statistic(traces, statistic_type, axis)
+        if not np.ndim(frequency_span[0]):
+            return self._statistic(
+                np.compress(self._span_mask(frequency_span),
+                            traces, axis=frequency_axis),
+                statistic_type, axis)
+        if (axis % traces.ndim) != (frequency_axis % traces.ndim):
+            raise ValueError('Multiple spans can only be stacked when the '
+                             'statistic is taken along the frequency axis')
+        return np.stack(
+            [self._statistic(np.compress(self._span_mask(span),
+                                         traces, axis=frequency_axis),
+                             statistic_type, axis)
+             for span in frequency_span], axis=-1)
+
+    def statistics(self, traces, axis=-1, frequency_span=None,
+                   frequency_axis=-1):
+        """
+        Returns an AttrDict with the mean, standard_deviation and
+        peak_to_peak of the traces, see statistic for the parameters.
+        """
+        enum = self.AgilentNAMeasurementStatisticTypeEnum
+        return AttrDict(
+            {'mean': self.statistic(
+                 traces, enum.AgilentNAMeasurementStatisticTypeMean,
+                 axis, frequency_span, frequency_axis),
+             'standard_deviation': self.statistic(
+                 traces,
+                 enum.AgilentNAMeasurementStatisticTypeStandardDeviation,
+                 axis, frequency_span, frequency_axis),
+             'peak_to_peak': self.statistic(
+                 traces, enum.AgilentNAMeasurementStatisticTypePeakToPeak,
+                 axis, frequency_span, frequency_axis)})
+
+    def _span_mask(self, frequency_span):
+        if self._frequency is None:
+            raise ValueError('A frequency grid is required for '
+                             'statistics over a frequency span')
+        f_start, f_stop = frequency_span
+        return ((self._frequency >= min(f_start, f_stop)) &
+                (self._frequency <= max(f_start, f_stop)))
+
+    def _statistic(self, traces, statistic_type, axis):
+        enum = self.AgilentNAMeasurementStatisticTypeEnum
+        if statistic_type == enum.AgilentNAMeasurementStatisticTypeMean:
+            return traces.mean(axis=axis)
+        elif statistic_type == \
+                enum.AgilentNAMeasurementStatisticTypeStandardDeviation:
+            return traces.std(axis=axis)
+        elif statistic_type == \
+                enum.AgilentNAMeasurementStatisticTypePeakToPeak:
+            return np.ptp(traces, axis=axis)
+        else:
+            raise ValueError('Unknown statistic type {}, expected one of the '
+                             'AgilentNAMeasurementStatisticTypeEnum '
+                             'values'.format(statistic_type))
+
+
+class AgilentNAGroupDelay(object):
+    """
+    This computes group delay and electrical length on the host from already
+    captured unwrapped phase (UPhase format) so that no extra
+    AgilentNAMeasurementGroupDelay trace has to be set up on the instrument.
+
+    Every sweep in the stack is handled in one call so the delay drift of a
+    whole phase vs time run comes out of the same capture.
+
+    Parameters
+    ----------
+    frequency : array like
+                The stimulus (frequency) grid that the phase is taken on.
+    aperture_points : int
+                      The number of frequency steps the phase slope is taken
+                      over, the same as the group delay aperture on the
+                      instrument.  1 is a plain point to point difference.
+    phase_units : string
+                  'degrees' (the instrument default) or 'radians'
+
+    Example
+    -------
+    >>> group_delay = AgilentNAGroupDelay(S['frequency'], aperture_points=11)
+    >>> delay = group_delay.group_delay(cumulative_phase_df)
+    >>> drift = group_delay.delay_drift(cumulative_phase_df)
+    >>> group_delay.electrical_length(cumulative_phase_df,
+    ...                               velocity_factor=0.7)
+    """
+    SPEED_OF_LIGHT = 299792458.0
+
+    def __init__(self, frequency, aperture_points=1, phase_units='degrees'):
+        self._frequency = np.asarray(frequency, dtype=float)
+        self.aperture_points = aperture_points
+        self.phase_units = phase_units
+
+    @property
+    def frequency(self):
+        return self._frequency
+
+    @property
+    def aperture_points(self):
+        return self._aperture_points
+
+    @aperture_points.setter
+    def aperture_points(self, NewValue):
+        if not 0 < int(NewValue) < self._frequency.size:
+            raise ValueError('The aperture must be between 1 and {} '
+                             'points'.format(self._frequency.size - 1))
+        self._aperture_points = int(NewValue)
+        # The difference window is centered on each point and slid inward at
+        # the band edges so that every point uses the full aperture
+        points = np.arange(self._frequency.size)
+        self._left = np.clip(points - self._aperture_points // 2,
+                             0, self._frequency.size - 1 -
+                             self._aperture_points)
+        self._right = self._left + self._aperture_points
+
+    @property
+    def phase_units(self):
+        return self._phase_units
+
+    @phase_units.setter
+    def phase_units(self, NewValue):
+        if NewValue not in ('degrees', 'radians'):
+            raise ValueError("phase_units must be 'degrees' or 'radians'")
+        self._phase_units = NewValue
+
+    def _phase_in_cycles(self, phase, frequency_axis):
+        phase = np.moveaxis(np.asarray(phase, dtype=float),
+                            frequency_axis, -1)
+        if phase.shape[-1] != self._frequency.size:
+            raise ValueError('Phase has {} points along the frequency axis '
+                             'but the frequency grid has {}'.format(
+                                 phase.shape[-1], self._frequency.size))
+        if self._phase_units == 'degrees':
+            return phase / 360.0
+        return phase / (2 * np.pi)
+
+    def group_delay(self, phase, frequency_axis=-1):
+        """
+        Returns the group delay in seconds at every point of every sweep.
+        """
+        cycles = self._phase_in_cycles(phase, frequency_axis)
+        delay = -((cycles[..., self._right] - cycles[..., self._left]) /
+                  (self._frequency[self._right] -
+                   self._frequency[self._left]))
+        return np.moveaxis(delay, -1, frequency_axis)
+
+    def electrical_length(self, phase, velocity_factor=1.0,
+                          frequency_axis=-1):
+        """
+        Returns the electrical length in meters at every point of every sweep.
+        """
+        return (self.group_delay(phase, frequency_axis) *
+                self.SPEED_OF_LIGHT * velocity_factor)
+
+    def electrical_delay(self, phase, frequency_axis=-1):
+        """
+        Returns one delay in seconds per sweep from a least squares linear
+        fit of the phase over the whole frequency grid, the same quantity
+        that the electrical delay marker function sets.
+        """
+        cycles = self._phase_in_cycles(phase, frequency_axis)
+        frequency = self._frequency - self._frequency.mean()
+        slope = ((cycles - cycles.mean(axis=-1, keepdims=True)) @
+                 frequency) / (frequency @ frequency)
+        return -slope
+
+    def delay_drift(self, phase, sweep_axis=0, frequency_axis=-1):
+        """
+        Returns the group delay of every sweep relative to the first sweep.
+        """
+        delay = self.group_delay(phase, frequency_axis)
+        return delay - np.take(delay, [0], axis=sweep_axis)
+
+
+class PhaseStabilityAnalyzer(object):
+    """
+    This computes phase stability statistics from a phase vs time capture,
+    such as the cumulative_phase_df from take_phase_vs_time_measurement
+    (time x frequency).
+
+    The overlapping Allan deviation, the modified Allan deviation and a
+    linear drift rate fit are computed for every frequency point at once.
+    The analyzer is incremental so it can be fed one sweep at a time during
+    a live capture, and the class methods do the same computation in one go
+    on a finished capture.
+
+    Phase is converted to time error, phase / (360 * frequency), when the
+    frequency grid is given so that the deviations come out as fractional
+    frequency stability.  Without a frequency grid the deviations are of the
+    phase itself.
+
+    Parameters
+    ----------
+    sample_interval : float
+                      Time between sweeps in seconds (tau0), e.g. the
+                      MEASUREMENT_TIME_SAMPLE_INTERVAL
+    averaging_factors : list of int
+                        The multiples of sample_interval to evaluate tau at.
+                        Defaults to octaves 1, 2, 4, ... 64.
+    frequency : array like
+                The stimulus (frequency) grid, in Hz
+    phase_units : string
+                  'degrees' (the instrument default) or 'radians'
+
+    Example
+    -------
+    >>> stability = PhaseStabilityAnalyzer(5, frequency=S['frequency'])
+    >>> for row in live_capture:
+    ...     stability.update(row)
+    >>> stability.tau
+    array([  5.,  10.,  20.,  40.,  80., 160., 320.])
+    >>> stability.allan_deviation.shape
+    (7, 1601)
+    or
+    >>> PhaseStabilityAnalyzer.allan_deviation_of(
+    ...     cumulative_phase_df, 5, frequency=S['frequency'])
+    """
+
+    def __init__(self, sample_interval, averaging_factors=None,
+                 frequency=None, phase_units='degrees'):
+        self._sample_interval = float(sample_interval)
+        if averaging_factors is None:
+            averaging_factors = [2 ** n for n in range(7)]
+        self._averaging_factors = np.asarray(sorted(set(
+            int(m) for m in averaging_factors)))
+        if self._averaging_factors[0] < 1:
+            raise ValueError('Averaging factors must be positive integers')
+        self._frequency = \
+            None if frequency is None else np.asarray(frequency, dtype=float)
+        self.phase_units = phase_units
+        self.reset()
+
+    def reset(self):
+        m_max = int(self._averaging_factors[-1])
+        self._sample_count = 0
+        self._history = deque(maxlen=2 * m_max + 1)
+        self._second_differences = \
+            [deque(maxlen=int(m)) for m in self._averaging_factors]
+        self._window_sums = [None] * len(self._averaging_factors)
+        self._adev_sums = None
+        self._adev_counts = np.zeros(len(self._averaging_factors))
+        self._mdev_sums = None
+        self._mdev_counts = np.zeros(len(self._averaging_factors))
+        self._time_origin = None
+        self._drift_sums = None
+
+    @property
+    def sample_interval(self):
+        return self._sample_interval
+
+    @property
+    def averaging_factors(self):
+        return self._averaging_factors
+
+    @property
+    def tau(self):
+        return self._averaging_factors * self._sample_interval
+
+    @property
+    def phase_units(self):
+        return self._phase_units
+
+    @phase_units.setter
+    def phase_units(self, NewValue):
+        if NewValue not in ('degrees', 'radians'):
+            raise ValueError("phase_units must be 'degrees' or 'radians'")
+        self._phase_units = NewValue
+
+    @property
+    def sample_count(self):
+        return self._sample_count
+
+    def update(self, phase, time=None):
+        """
+        Adds one sweep (one row of phase, one value per frequency point).
+        time defaults to sample_count * sample_interval.
+        """
+        phase = np.asarray(phase, dtype=float)
+        if time is None:
+            time = self._sample_count * self._sample_interval
+        x = self.time_error(phase, self._frequency, self._phase_units)
+
+        if self._adev_sums is None:
+            self._adev_sums = np.zeros((len(self._averaging_factors),) +
+                                       x.shape)
+            self._mdev_sums = np.zeros_like(self._adev_sums)
+            self._drift_sums = [0.0, 0.0, 0.0,
+                                np.zeros(phase.shape), np.zeros(phase.shape)]
+            self._time_origin = float(time)
+
+        self._history.append(x)
+        for k, m in enumerate(self._averaging_factors):
+            if len(self._history) <= 2 * m:
+                break
+            d = x - 2 * self._history[-1 - m] + self._history[-1 - 2 * m]
+            self._adev_sums[k] += d * d
+            self._adev_counts[k] += 1
+            # Running sum of the last m second differences for the
+            # modified Allan deviation
+            if self._window_sums[k] is None:
+                self._window_sums[k] = np.zeros(x.shape)
+            if len(self._second_differences[k]) == m:
+                self._window_sums[k] -= self._second_differences[k][0]
+            self._second_differences[k].append(d)
+            self._window_sums[k] += d
+            if len(self._second_differences[k]) == m:
+                self._mdev_sums[k] += self._window_sums[k] ** 2
+                self._mdev_counts[k] += 1
+
+        t = float(time) - self._time_origin
+        self._drift_sums[0] += 1
+        self._drift_sums[1] += t
+        self._drift_sums[2] += t * t
+        self._drift_sums[3] += phase
+        self._drift_sums[4] += t * phase
+        self._sample_count += 1
+
+    def extend(self, phase, times=None):
+        """
+        Adds a block of sweeps (time x frequency), e.g. a DataFrame of rows.
+        """
+        phase = np.asarray(phase, dtype=float)
+        if times is None:
+            times = [None] * len(phase)
+        for row, time in zip(phase, times):
+            self.update(row, time)
+
+    @property
+    def allan_deviation(self):
+        if self._adev_sums is None:
+            return None
+        tau = self.tau.reshape((-1,) + (1,) * (self._adev_sums.ndim - 1))
+        counts = self._adev_counts.reshape(tau.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(counts > 0,
+                            np.sqrt(self._adev_sums /
+                                    (2 * tau ** 2 * counts)),
+                            np.nan)
+
+    @property
+    def modified_allan_deviation(self):
+        if self._mdev_sums is None:
+            return None
+        tau = self.tau.reshape((-1,) + (1,) * (self._mdev_sums.ndim - 1))
+        m = self._averaging_factors.reshape(tau.shape)
+        counts = self._mdev_counts.reshape(tau.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(counts > 0,
+                            np.sqrt(self._mdev_sums /
+                                    (2 * m ** 2 * tau ** 2 * counts)),
+                            np.nan)
+
+    @property
+    def drift_rate(self):
+        """
+        The least squares phase drift rate, phase units per second, of every
+        frequency point over everything seen so far.
+        """
+        if self._drift_sums is None:
+            return None
+        n, st, stt, sy, sty = self._drift_sums
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (n * sty - st * sy) / (n * stt - st * st)
+
+    @staticmethod
+    def time_error(phase, frequency=None, phase_units='degrees'):
+        if phase_units not in ('degrees', 'radians'):
+            raise ValueError("phase_units must be 'degrees' or 'radians'")
+        phase = np.asarray(phase, dtype=float)
+        if frequency is None:
+            return phase
+        cycles = phase / (360.0 if phase_units == 'degrees' else 2 * np.pi)
+        return cycles / np.asarray(frequency, dtype=float)
+
+    @staticmethod
+    def _default_factors(sample_count, averaging_factors, span):
+        # span is how many averaging factors one term of the statistic
+        # covers, 2 for the Allan deviation and 3 for the modified one
+        if averaging_factors is None:
+            averaging_factors = [2 ** n for n in range(64)
+                                 if 2 ** n < sample_count]
+        return np.asarray([m for m in averaging_factors
+                           if span * m <= sample_count - (span == 2)],
+                          dtype=int)
+
+    @classmethod
+    def allan_deviation_of(cls, phase, sample_interval,
+                           averaging_factors=None, frequency=None,
+                           phase_units='degrees'):
+        """
+        Returns (tau, deviation) for a whole capture (time x frequency),
+        deviation is averaging factors x frequency.
+        """
+        x = cls.time_error(phase, frequency, phase_units)
+        factors = cls._default_factors(len(x), averaging_factors, 2)
+        deviation = np.empty((len(factors),) + x.shape[1:])
+        for k, m in enumerate(factors):
+            d = x[2 * m:] - 2 * x[m:-m] + x[:-2 * m]
+            deviation[k] = np.sqrt((d * d).sum(axis=0) /
+                                   (2 * (m * sample_interval) ** 2 * len(d)))
+        return factors * float(sample_interval), deviation
+
+    @classmethod
+    def modified_allan_deviation_of(cls, phase, sample_interval,
+                                    averaging_factors=None, frequency=None,
+                                    phase_units='degrees'):
+        """
+        Returns (tau, deviation) for a whole capture (time x frequency),
+        deviation is averaging factors x frequency.
+        """
+        x = cls.time_error(phase, frequency, phase_units)
+        factors = cls._default_factors(len(x), averaging_factors, 3)
+        deviation = np.empty((len(factors),) + x.shape[1:])
+        for k, m in enumerate(factors):
+            d = x[2 * m:] - 2 * x[m:-m] + x[:-2 * m]
+            c = np.concatenate([np.zeros((1,) + d.shape[1:]),
+                                np.cumsum(d, axis=0)])
+            window = c[m:] - c[:-m]
+            deviation[k] = np.sqrt((window * window).sum(axis=0) /
+                                   (2 * m ** 2 * (m * sample_interval) ** 2 *
+                                    len(window)))
+        return factors * float(sample_interval), deviation
+
+    @staticmethod
+    def drift_rate_of(phase, time):
+        """
+        Returns the least squares phase drift rate, phase units per second,
+        of every frequency point of a whole capture.
+        """
+        phase = np.asarray(phase, dtype=float)
+        time = np.asarray(time, dtype=float)
+        time = time - time.mean()
+        return ((time @ (phase - phase.mean(axis=0))) / (time @ time))
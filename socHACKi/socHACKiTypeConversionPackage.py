@@ -3,10 +3,12 @@ Author: John Sochacki
 This module is a collection of static and class methods that are used for
 making working with pandas data frames more simple.
 """
+import numpy as np
 import pandas as pd
 
 
 class SKungFu(object):
+    _no_positions = np.array([], dtype=np.intp)
 
     def __init__(self):
         pass
@@ -20,11 +22,16 @@ class SKungFu(object):
         # return(args[0])
         # return(kwargs)
 
-    @staticmethod
-    def PandasSeriesCellIndiciesBasedOnString(ps, STRING_VAL):
+    @classmethod
+    def PandasSeriesCellIndiciesBasedOnString(cls, ps, STRING_VAL):
         """
-        This function does a simple list comprehension comparison and returns
-        the indicies for whom which the comparison results in true
+        This function does a case insensitive comparison of the string form
+        of every cell with STRING_VAL and returns the indicies (positions)
+        for whom which the comparison results in true
+
+        The comparison is done in a single vectorized pass over the Series,
+        use PandasColumnSearchIndex when searching the same Series for many
+        values.
 
         Parameters
         ----------
@@ -44,7 +51,6 @@ class SKungFu(object):
         >>> pseries=pd.Series(['there','there','now','child'])
         >>> PandasSeriesCellIndiciesBasedOnString(pseries,'there')
         [0, 1]
-
         """
         try:
             assert isinstance(ps, pd.Series)
@@ -59,8 +65,63 @@ class SKungFu(object):
                   ' of type {} but must be of type {}'.format(
                       type(ps), type(pd.Series())))
         else:
-            return [index for index, value in enumerate(ps)
-                    if ps.astype(str) [index].lower() == STRING_VAL.lower()]
+            return np.flatnonzero(cls._SearchStrings(ps) ==
+                                  str(STRING_VAL).lower()).tolist()
+
+    @classmethod
+    def PandasColumnSearchIndex(cls, *args, **kwargs):
+        """
+        This function takes in a pandas data frame (or series) and returns a
+        reusable search index of the first column, a dictionary mapping the
+        lowercased string form of every distinct cell to the indicies of the
+        cells holding it.  Pass it to PandasCellIndicies through search_index
+        to answer many searches of the same column with one scan.
+
+        kwargs:
+        ------
+            column_number : int NOT float
+                            sets the column number to index
+            column_name :   string
+                            sets the column name to index
+
+        Example
+        -------
+        >>> import pandas as pd
+        >>> dframe=pd.DataFrame({'a':['hi','nan',float('nan'),float('nan')]
+                                 ,'b':['hi','there','good','looking']})
+        >>> Index = SKungFu.PandasColumnSearchIndex(dframe)
+        >>> SKungFu.PandasCellIndicies(dframe,string_value='hi',
+        ...                            search_index=Index)
+        [0]
+
+        Warning
+        --------
+        The index describes the frame as it was when the index was built, it
+        is up to you to build a new one after changing the frame.
+        """
+        if len(args) != 1:
+            raise TypeError('PandasColumnSearchIndex expected 1 arguement and'
+                            ' 0 - 1 Keywords, got {} and {}'.format(
+                                len(args), len(kwargs)))
+        elif isinstance(args[0], pd.Series):
+            return cls._SearchIndex(args[0])
+        else:
+            return cls._SearchIndex(args[0],
+                                    cls._SearchColumn(args[0], kwargs))
+
+    @classmethod
+    def _SearchIndex(cls, pdf, column=None):
+        # Index of the Series pdf, or of pdf[column] for a DataFrame
+        ps = pdf if column is None else pdf[column]
+        codes, uniques = pd.factorize(cls._SearchStrings(ps))
+        return {uniques[code]: positions for code, positions in
+                pd.Series(codes).groupby(codes, sort=False).indices.items()}
+
+    @staticmethod
+    def _SearchStrings(ps):
+        # astype(str) leaves missing cells missing on newer pandas, they are
+        # searched for as 'nan'
+        return ps.astype(str).fillna('nan').str.lower().to_numpy(dtype=object)
 
     @classmethod
     def PandasCellIndicies(cls, *args, **kwargs):
@@ -86,6 +147,10 @@ class SKungFu(object):
             column_name :   string
                             sets the column name to search
                             for string_value or 'nan'
+            search_index :  dict
+                            an index of the column to search made by
+                            PandasColumnSearchIndex, used instead of scanning
+                            the column
 
         Example
         -------
@@ -123,23 +188,103 @@ class SKungFu(object):
                   ' of type {} but must be of type {}'.format(
                       type(pdf), type(pd.DataFrame())))
         else:
-            if 'string_value' in kwargs:
-                if 'column_number' in kwargs:
-                    ps = pdf[pdf.columns[kwargs['column_number']]]
-                elif 'column_name' in kwargs:
-                    ps = pdf[kwargs['column_name']]
-                else:
-                    ps = pdf[pdf.columns[0]]
-                return cls.PandasSeriesCellIndiciesBasedOnString(
-                                             ps, kwargs['string_value'])
-            else:
-                if 'column_number' in kwargs:
-                    ps = pdf[pdf.columns[kwargs['column_number']]]
-                elif 'column_name' in kwargs:
-                    ps = pdf[kwargs['column_name']]
+            STRING_VAL = str(kwargs.get('string_value', 'nan')).lower()
+            if kwargs.get('search_index') is not None:
+                return kwargs['search_index'].get(
+                    STRING_VAL, cls._no_positions).tolist()
+            return np.flatnonzero(cls._SearchStrings(
+                pdf[cls._SearchColumn(pdf, kwargs)]) == STRING_VAL).tolist()
+
+    @classmethod
+    def PandasCellIndiciesForValues(cls, *args, **kwargs):
+        """
+        This function takes in a pandas data frame and a list of values and
+        returns the indicies of the cells matching each value in the first
+        column in a single pass.  The comparison is the same case insensitive
+        one used by PandasCellIndicies, so looking up hundreds of values
+        (e.g. every CPN on a BOM) costs one scan of the column rather than
+        one per value.
+
+        Parameters
+        ----------
+        pd : pandas.core.frame
+             Pandas DataFrame Object passed in throught args[0]
+        values : list
+                 Values to search for passed in throught args[1]
+
+        kwargs:
+        ------
+            column_number : int NOT float
+                            sets the column number to search
+            column_name :   string
+                            sets the column name to search
+            search_index :  dict
+                            an index of the column to search made by
+                            PandasColumnSearchIndex, used instead of scanning
+                            the column
+
+        Returns
+        -------
+        found : dict
+                Maps every value that was found to the list of its indicies
+        missing : list
+                  The values that were not found, in the order given
+
+        Example
+        -------
+        >>> import pandas as pd
+        >>> dframe=pd.DataFrame({'a':['hi','nan',float('nan'),float('nan')]
+                                 ,'b':['hi','there','good','looking']})
+        >>> SKungFu.PandasCellIndiciesForValues(dframe,['Hi','nan','bye'])
+        ({'Hi': [0], 'nan': [1, 2, 3]}, ['bye'])
+        >>> SKungFu.PandasCellIndiciesForValues(dframe,['there','good'],
+        ...                                     column_name='b')
+        ({'there': [1], 'good': [2]}, [])
+
+        Warning
+        --------
+        Please either specify column_name or column_number but not both.
+        """
+        if len(args) != 2:
+            raise TypeError('PandasCellIndiciesForValues expected 2 arguement'
+                            ' and 0 - 2 Keywords, got {} and {}'.format(
+                                len(args), len(kwargs)))
+        else:
+            pdf = args[0]
+            values = args[1]
+
+        try:
+            assert isinstance(pdf, pd.DataFrame)
+        except AssertionError as e:
+            print(e)
+            print('You are seeing this error because the item you provided is'
+                  ' of type {} but must be of type {}'.format(
+                      type(pdf), type(pd.DataFrame())))
+        else:
+            SearchIndex = kwargs.get('search_index')
+            if SearchIndex is None:
+                SearchIndex = cls._SearchIndex(pdf,
+                                               cls._SearchColumn(pdf, kwargs))
+            found = {}
+            missing = {}
+            for value in values:
+                if value in found or value in missing:
+                    continue
+                positions = SearchIndex.get(str(value).lower())
+                if positions is None:
+                    missing[value] = None
                 else:
-                    ps = pdf[pdf.columns[0]]
-                return cls.PandasSeriesCellIndiciesBasedOnString(ps, 'nan')
+                    found[value] = positions.tolist()
+            return found, list(missing)
+
+    @staticmethod
+    def _SearchColumn(pdf, kwargs):
+        if 'column_number' in kwargs:
+            return pdf.columns[kwargs['column_number']]
+        elif 'column_name' in kwargs:
+            return kwargs['column_name']
+        else:
+            return pdf.columns[0]
 
     @staticmethod
     def PandasDropAndFormat(*args, **kwargs):
@@ -366,46 +511,59 @@ class SKungFu(object):
             sort_column = kwargs['unique_values_column_name']
             newest_based_on = kwargs['rev_or_date_column_name']
 
-        NonUniqueValues = {key: val
-                           for key, val in
-                           pdf.groupby(sort_column).groups.items()
-                           if len(val) > 1}
-        NonUniqueIndiciesToKeep = {}
-        for key, val in NonUniqueValues.items():
-            index_to_grab = val[-1]
-            for index in val[:-1]:
-                # IF THE REV AT THE CURRENT INDEX IS THE SAME AS THAT AT THE
-                # REV THAT IS IDENTIFIED TO BE THE NEWEST
-                # SKIP ALL OF THE FOLLOWING
-                if pdf[newest_based_on].loc[index] != \
-                   pdf[newest_based_on].loc[index_to_grab]:
-                    try:
-                        float(pdf[newest_based_on].loc[index].split(' ')[0]) \
-                        > float(pdf[newest_based_on].loc[index_to_grab].split(' ')[0])
-                    except ValueError as e:
-                        try:
-                            float(pdf[newest_based_on].loc[index].split(' ')[0])
-                        except ValueError as e:
-                            pass
-                        else:
-                            index_to_grab = index
-                    else:
-                        if float(pdf[newest_based_on].loc[index].split(' ')[0]) \
-                           > float(pdf[newest_based_on].loc[index_to_grab].split(' ')[0]):
-                            index_to_grab = index
-            # ADD TO THE LIST
-            NonUniqueIndiciesToKeep[key] = index_to_grab
-
-        NonUniqueIndiciesToDrop = {}
-        for key, val in NonUniqueIndiciesToKeep.items():
-            NonUniqueIndiciesToDrop[key] = [item
-                                            for item in NonUniqueValues[key]
-                                            if item != val]
-
-        ListIndiciesToDrop = []
-        [ListIndiciesToDrop.extend(vals)
-         for keys, vals in NonUniqueIndiciesToDrop.items()]
-        ListIndiciesToDrop.sort()
+        # PARSE EVERY DISTINCT REV / DATE ONCE, FROM THE TEXT BEFORE THE
+        # FIRST SPACE, AS 2 WHEN IT IS A NUMBER, 1 WHEN IT READS AS NAN AND
+        # 0 WHEN IT DOES NOT PARSE AT ALL
+        Codes, Uniques = pd.factorize(pdf[newest_based_on], sort=False)
+        Parsed = np.full(len(Uniques) + 1, np.nan)
+        Status = np.zeros(len(Uniques) + 1, dtype=np.int8)
+        for code, value in enumerate(Uniques):
+            try:
+                Parsed[code] = float(value.split(' ')[0] if
+                                     isinstance(value, str) else value)
+            except (TypeError, ValueError):
+                continue
+            Status[code] = 1 if np.isnan(Parsed[code]) else 2
+        Value = Parsed[Codes]
+        Status = Status[Codes]
+
+        # STABLE SORT THE ROWS INTO THEIR GROUPS, LEAVING OUT EMPTY PART
+        # NUMBERS WHICH ARE NEVER DROPPED, AND KEEP GROUPS OF MORE THAN ONE
+        Groups = pdf.groupby(sort_column, sort=False).ngroup().fillna(
+            -1).to_numpy(dtype=np.intp)
+        Multiple = np.bincount(Groups[Groups >= 0],
+                               minlength=1)[np.maximum(Groups, 0)] > 1
+        Multiple[Groups < 0] = False
+        Order = np.flatnonzero(Multiple)
+        Order = Order[np.argsort(Groups[Order], kind='stable')]
+        if len(Order):
+            Starts = np.flatnonzero(np.r_[True, np.diff(Groups[Order]) != 0])
+            Sizes = np.diff(np.r_[Starts, len(Order)])
+            Last = Order[Starts + Sizes - 1]
+            IsNumber = Status[Order] == 2
+            Newest = np.maximum.reduceat(
+                np.where(IsNumber, Value[Order], -np.inf), Starts)
+            FirstNewest = np.minimum.reduceat(
+                np.where(IsNumber & (Value[Order] ==
+                                     np.repeat(Newest, Sizes)),
+                         Order, len(pdf)), Starts)
+            FirstParsed = np.minimum.reduceat(
+                np.where(Status[Order] > 0, Order, len(pdf)), Starts)
+            FirstParsedStatus = Status[np.minimum(FirstParsed, len(pdf) - 1)]
+
+            # START FROM THE LAST ROW OF THE GROUP AND MOVE TO AN EARLIER ONE
+            # ONLY IF ITS REV / DATE IS STRICTLY NEWER, OR IF THE LAST ONE
+            # DOES NOT PARSE, TO THE FIRST ONE THAT DOES
+            Keep = np.where(Status[Last] == 1, Last,
+                   np.where(Status[Last] == 2,
+                            np.where(Value[Last] == Newest, Last, FirstNewest),
+                   np.where(FirstParsed == len(pdf), Last,
+                            np.where(FirstParsedStatus == 1,
+                                     FirstParsed, FirstNewest))))
+            Multiple[Keep] = False
+            ListIndiciesToDrop = list(pdf.index[Multiple])
+        else:
+            ListIndiciesToDrop = []
         cls.PandasDropAndFormat(pdf, ListIndiciesToDrop)
 
     @staticmethod
@@ -830,6 +988,178 @@ class SKungFu(object):
         else:
             return MachineGeneratedAgileBOM
 
+# Required imports if put in sepatate package
+# import numpy as np
+# import pandas as pd
+# from socHACKi.socHACKiTypeConversionPackage import SKungFu
+
+
+class SKungFuPipeline(object):
+    """
+    Records a chain of DataFrame clean up steps and runs them all at once.
+
+    The SKungFu drop helpers each work in place and rebuild the index after
+    every call, so a chain of them copies the frame once per step.  A
+    pipeline only keeps track of which rows survive and what happens to
+    each column, then takes the surviving rows and columns in one go and
+    rebuilds the index once at the end.  The steps are kept, not the data,
+    so the same pipeline can be run on every export that has the same
+    columns.
+
+    Every step returns the pipeline so they can be chained, and row
+    positions and column numbers refer to the frame as it is at that point
+    in the chain, exactly as if the steps had been run one after another.
+
+    Example
+    -------
+    >>> import pandas as pd
+    >>> dframe=pd.DataFrame({'a':['hi','nan',float('nan'),float('nan')]
+                             ,'b':['hi','there','good','looking']})
+    >>> Pipeline = (SKungFuPipeline()
+    ...             .DropRowsContainingValueInColumn(column_name='b',
+    ...                                              string_value='there')
+    ...             .DropColumns(['a'])
+    ...             .Rename({'b': 'Word'}))
+    >>> Pipeline.Run(dframe)
+          Word
+    0       hi
+    1     good
+    2  looking
+
+    Warning
+    --------
+    Run returns a new DataFrame and leaves the one passed in untouched,
+    unlike the SKungFu helpers.
+    """
+    def __init__(self):
+        self.steps = []
+
+    def DropRowsContainingValueInColumn(self, string_value='nan',
+                                        column_name=None, column_number=None):
+        """
+        Drops the rows whose cell matches string_value, case insensitive, in
+        the given column (the first column by default), the same way as
+        SKungFu.PandasDropRowsContainingValueInColumn.
+        """
+        self.steps.append(('search', str(string_value).lower(),
+                           column_name, column_number))
+        return self
+
+    def DropRows(self, positions):
+        """
+        Drops the rows at positions, the same way as
+        SKungFu.PandasDropAndFormat.
+        """
+        self.steps.append(('rows', list(positions)))
+        return self
+
+    def DropColumns(self, columns, by_position=False):
+        """
+        Drops columns given by label, labels that do not exist are ignored,
+        or given by number when by_position is True.
+        """
+        self.steps.append(('columns', list(columns), by_position))
+        return self
+
+    def Rename(self, mapping):
+        """
+        Renames columns using a {from: to} dictionary, running the pipeline
+        raises a ValueError if two columns would end up with the same name.
+        """
+        self.steps.append(('rename', dict(mapping)))
+        return self
+
+    def Cast(self, dtypes):
+        """
+        Casts columns using a {column: dtype} dictionary, or every column if
+        a single dtype is given.
+        """
+        self.steps.append(('cast', dtypes))
+        return self
+
+    def RemoveDuplicates(self, subset=None, keep='first'):
+        """
+        Drops duplicate rows, considering only the columns in subset if given,
+        with keep meaning the same as in pandas.DataFrame.drop_duplicates.
+        """
+        self.steps.append(('duplicates', subset, keep))
+        return self
+
+    def Run(self, pdf):
+        """
+        Runs the recorded steps on pdf and returns the cleaned up DataFrame.
+        """
+        if not isinstance(pdf, pd.DataFrame):
+            raise ValueError('Run expected a {} but got a {}'.format(
+                type(pd.DataFrame()), type(pdf)))
+        # Positions in pdf of the rows still left
+        Rows = np.arange(len(pdf))
+        # Current column name -> (column in pdf, dtypes cast to so far)
+        Columns = {column: (column, []) for column in pdf.columns}
+
+        for step in self.steps:
+            if step[0] == 'search':
+                Names = list(Columns)
+                if step[3] is not None:
+                    column = Names[step[3]]
+                elif step[2] is not None:
+                    column = step[2]
+                else:
+                    column = Names[0]
+                Rows = Rows[SKungFu._SearchStrings(self._Column(
+                    pdf, Rows, *Columns[column])) != step[1]]
+            elif step[0] == 'rows':
+                Keep = np.ones(len(Rows), dtype=bool)
+                Keep[step[1]] = False
+                Rows = Rows[Keep]
+            elif step[0] == 'columns':
+                if step[2]:
+                    Names = list(Columns)
+                    Drop = [Names[column] for column in step[1]]
+                else:
+                    Drop = step[1]
+                for column in Drop:
+                    Columns.pop(column, None)
+            elif step[0] == 'rename':
+                Renamed = {step[1].get(column, column): value
+                           for column, value in Columns.items()}
+                if len(Renamed) != len(Columns):
+                    raise ValueError(
+                        'Renaming with {} gives more than one column the '
+                        'same name'.format(step[1]))
+                Columns = Renamed
+            elif step[0] == 'cast':
+                if isinstance(step[1], dict):
+                    DTypes = step[1]
+                else:
+                    DTypes = dict.fromkeys(Columns, step[1])
+                Columns = {column: (Source, Casts + [DTypes[column]])
+                           if column in DTypes else (Source, Casts)
+                           for column, (Source, Casts) in Columns.items()}
+            elif step[0] == 'duplicates':
+                Subset = list(Columns) if step[1] is None else step[1]
+                Frame = pd.DataFrame(
+                    {column: self._Column(pdf, Rows, *Columns[column])
+                     .to_numpy() for column in Subset})
+                Rows = Rows[~Frame.duplicated(keep=step[2]).to_numpy()]
+
+        Result = pdf[[Source for Source, Casts in Columns.values()]].take(Rows)
+        Result.columns = list(Columns)
+        for column, (Source, Casts) in Columns.items():
+            for dtype in Casts:
+                Result[column] = Result[column].astype(dtype)
+        Result.index = pd.RangeIndex(len(Result))
+        return Result
+
+    @staticmethod
+    def _Column(pdf, Rows, Source, DTypes):
+        # The column as it is at this point in the chain, surviving rows only
+        ps = pdf[Source].take(Rows)
+        for dtype in DTypes:
+            ps = ps.astype(dtype)
+        return ps
+
+
 # Required imports if put in sepatate package
 # import pandas as pd
 
@@ -8,16 +8,41 @@ from tkinter import Listbox
 from tkinter import Label
 from tkinter import Button
 from tkinter import Frame
-from tkinter import TOP, RIGHT, BOTTOM, LEFT, Y, END, SINGLE
+from tkinter import TOP, RIGHT, BOTTOM, LEFT, X, Y, END, SINGLE
 from tkinter import Scrollbar
+from tkinter import Entry
+from tkinter import StringVar
 from tkinter import font
 
 import xml.dom.minidom
+from xml.dom.minicompat import NodeList
+import xml.etree.ElementTree as ElementTree
+from bisect import bisect_left
+import functools
+import heapq
+import re
 
 import os
+import sys
+import datetime
+import json
+import marshal
+import pickle
+import hashlib
+import zipfile
+import posixpath
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from fnmatch import fnmatch
+import zlib
+import struct
+import ctypes
+import ctypes.util
 
 from tabulate import tabulate
 
+import xlsxwriter
+
+import numpy as np
 import pandas as pd
 # Required imports if put in sepatate package
 # from tabulate import tabluate
@@ -31,6 +56,124 @@ class PandasPrinter(object):
     def pd_print(pd):
         print(tabulate(pd, headers='keys', tablefmt='fancy_grid'))
 
+    @staticmethod
+    def pd_print_window(pdf, head=10, tail=10, stream=None, sample_size=1000,
+                        max_column_width=40, chunk_size=1000):
+        """
+        Prints a DataFrame in the same fancy_grid layout as pd_print, but
+        one row at a time and only the rows that are asked for, so looking
+        at a 100k row capture does not format 100k rows.
+
+        Parameters
+        ----------
+        pdf : DataFrame
+        head : int
+               Rows printed from the top, None prints every row.
+        tail : int
+               Rows printed from the bottom.
+        stream : file like object
+                 Where the table is written, sys.stdout by default.
+        sample_size : int
+                      When every row is printed the column widths come from
+                      this many random rows, longer cells are cut to fit.
+        max_column_width : int
+                           Cells wider than this are cut.
+        chunk_size : int
+                     Rows taken out of the DataFrame at a time.
+
+        Example
+        -------
+
+        >>> PandasPrinter.pd_print_window(cumulative_phase_df, head=3, tail=2)
+        ╒══════╤════════════╤════════════╕
+        │      │   10000000 │  100000000 │
+        ╞══════╪════════════╪════════════╡
+        │    0 │          0 │          0 │
+        ├──────┼────────────┼────────────┤
+        ...
+        │  ⋮   │     ⋮      │     ⋮      │
+        ...
+        ╘══════╧════════════╧════════════╛
+        [180 rows x 2 columns]
+        """
+        if stream is None:
+            stream = sys.stdout
+        RowCount = len(pdf)
+        tail = tail or 0
+        if head is not None and RowCount > head + tail:
+            Segments = [(0, head), (RowCount - tail, RowCount)]
+            Sample = pdf.iloc[np.r_[0:head, RowCount - tail:RowCount]]
+        else:
+            Segments = [(0, RowCount)]
+            if sample_size is not None and RowCount > sample_size:
+                # The Generator draws a small sample without replacement
+                # without permuting every row the way RandomState does
+                Sample = pdf.iloc[np.sort(np.random.default_rng(0).choice(
+                    RowCount, sample_size, replace=False))]
+            else:
+                Sample = pdf
+
+        Labels = [str(pdf.index.name if pdf.index.name is not None else '')]
+        Labels.extend(str(Label) for Label in pdf.columns)
+        Widths = [min(len(Label), max_column_width) for Label in Labels]
+        for Row in Sample.itertuples(name=None):
+            for Position, Value in enumerate(Row):
+                Widths[Position] = max(Widths[Position], len(
+                    PandasPrinter._format_cell(Value, max_column_width)))
+        # Numbers are right aligned like tabulate does
+        RightAligned = [pd.api.types.is_numeric_dtype(pdf.index.dtype)]
+        RightAligned.extend(pd.api.types.is_numeric_dtype(dtype) and
+                            not pd.api.types.is_bool_dtype(dtype)
+                            for dtype in pdf.dtypes)
+
+        def rule(left, fill, middle, right):
+            return left + middle.join(fill * (Width + 2)
+                                      for Width in Widths) + right + '\n'
+
+        def line(Texts):
+            return '│ ' + ' │ '.join(
+                Text.rjust(Width) if Right else Text.ljust(Width)
+                for Text, Width, Right
+                in zip(Texts, Widths, RightAligned)) + ' │\n'
+
+        stream.write(rule('╒', '═', '╤', '╕'))
+        stream.write(line([PandasPrinter._format_cell(Label, Width)
+                           for Label, Width in zip(Labels, Widths)]))
+        stream.write(rule('╞', '═', '╪', '╡'))
+        RowSeparator = rule('├', '─', '┼', '┤')
+        First = True
+        for SegmentNumber, (Start, Stop) in enumerate(Segments):
+            if SegmentNumber:
+                stream.write(RowSeparator)
+                stream.write('│ ' + ' │ '.join('⋮'.center(Width)
+                                               for Width in Widths) +
+                             ' │\n')
+            for ChunkStart in range(Start, Stop, chunk_size):
+                for Row in pdf.iloc[ChunkStart:min(ChunkStart + chunk_size,
+                                                   Stop)].itertuples(
+                                                       name=None):
+                    if not First:
+                        stream.write(RowSeparator)
+                    First = False
+                    stream.write(line([
+                        PandasPrinter._format_cell(Value, Width)
+                        for Value, Width in zip(Row, Widths)]))
+        stream.write(rule('╘', '═', '╧', '╛'))
+        stream.write('[{} rows x {} columns]\n'.format(RowCount,
+                                                        pdf.shape[1]))
+
+    @staticmethod
+    def _format_cell(Value, Width):
+        if Value is None:
+            Text = ''
+        elif isinstance(Value, float):
+            Text = format(Value, 'g')
+        else:
+            Text = str(Value).replace('\n', ' ')
+        if len(Text) > Width:
+            Text = Text[:max(Width - 1, 0)] + '…'
+        return Text
+
 
 # Required imports if put in sepatate package
 # from Sochacki.SochackiUtilityPackage import AttrDict
@@ -62,10 +205,33 @@ class HRBOMInformation(object):
     or
     >>> instance = HRBOMInformation({'sheet1':'val1','sheet2':{}})
     >>> instance.bom_dom.sheet1.items = 1231231
+
+    Whole BOMs can be loaded in bulk and are then looked up through hash
+    indexes on the CPN and Manufacturer_Part_Number columns
+
+    >>> instance = HRBOMInformation()
+    >>> instance.load_excel('human_bom.xlsx')
+    >>> instance.row_count
+    51234
+    >>> instance.find_rows('CPN', 'CL-00000031231')
+    [17]
+    >>> instance.row(17)
+    {'CPN': 'CL-00000031231', 'Manufacturer_Name': 'Murata', ...}
+    >>> instance.duplicates('Manufacturer_Part_Number')
+    {'GRM155R71C104KA88D': [3, 907]}
+
+    Warning
+    -------
+    The indexes are kept up to date by add_row and the load_* methods, which
+    also keep every column the same length.  If you assign cells by hand
+    through bom_dom call rebuild_indexes afterwards.
     """
+    _default_indexed_columns = ('CPN', 'Manufacturer_Part_Number')
+
     def __init__(self, *args):
         self._document_name = ''
         self._sheet_names = []
+        self._row_count = 0
         if len(args) == 2:
             self._column_names_and_order = args[0]
             self._column_names_and_default_values = args[1]
@@ -92,6 +258,11 @@ class HRBOMInformation(object):
                                              'BOM_Special_Notes_About_CPN': '',
                                              'General_Notes': ''}
         self.create_empty_data_columns()
+        self._indexed_columns = [ColumnName
+                                 for ColumnName
+                                 in HRBOMInformation._default_indexed_columns
+                                 if ColumnName in self.column_names_and_order]
+        self.rebuild_indexes()
 
     @property
     def document_name(self):
@@ -125,6 +296,138 @@ class HRBOMInformation(object):
             else:
                 self.bom_dom = AttrDict({ColumnName: StringListCollector()})
 
+    @property
+    def row_count(self):
+        return self._row_count
+
+    @property
+    def indexed_columns(self):
+        return self._indexed_columns
+
+    def default_value(self, ColumnName):
+        # A list of defaults is the list of allowed values, the first of
+        # which is used for cells that are not provided
+        default = self.column_names_and_default_values.get(ColumnName, '')
+        if isinstance(default, (list, tuple)):
+            return default[0] if default else ''
+        return default
+
+    def add_row(self, row):
+        """
+        Appends one BOM line given as a {column name: value} dictionary.
+        Columns that are not provided get their default value.
+        """
+        for ColumnName in self.column_names_and_order:
+            self.bom_dom[ColumnName].items = \
+                row.get(ColumnName, self.default_value(ColumnName))
+        for ColumnName in self._indexed_columns:
+            self._index_rows(ColumnName, self._row_count, self._row_count + 1)
+        self._row_count += 1
+
+    def load_dataframe(self, pdf):
+        """
+        Appends every row of a DataFrame whose columns are named after the
+        BOM columns.  Columns missing from the DataFrame and missing (blank)
+        cells are filled with their default value and extra columns are
+        ignored.
+        """
+        start = self._row_count
+        for ColumnName in self.column_names_and_order:
+            if ColumnName in pdf.columns:
+                Column = pdf[ColumnName]
+                if Column.hasnans:
+                    Column = Column.astype(object).fillna(
+                        self.default_value(ColumnName))
+                self.bom_dom[ColumnName].extend(Column)
+            else:
+                self.bom_dom[ColumnName].extend(
+                    pd.Series([self.default_value(ColumnName)] * len(pdf),
+                              dtype=object))
+        self._row_count += len(pdf)
+        for ColumnName in self._indexed_columns:
+            self._index_rows(ColumnName, start, self._row_count)
+
+    def load_excel(self, file_name, sheet_name=0, cache=None, **kwargs):
+        """
+        Appends a BOM sheet from an excel workbook, kwargs are passed on to
+        pandas.read_excel.  Cells are read as strings by default so part
+        numbers keep their leading zeros, and only blank cells count as
+        missing ('NA' is a string like any other).  With an ExcelCache
+        unchanged workbooks are not parsed again.
+        """
+        kwargs.setdefault('dtype', str)
+        kwargs.setdefault('keep_default_na', False)
+        kwargs.setdefault('na_values', [''])
+        if cache is None:
+            pdf = pd.read_excel(file_name, sheet_name=sheet_name, **kwargs)
+        else:
+            pdf = cache.read_excel(file_name, sheet_name=sheet_name,
+                                   **kwargs)
+        self.load_dataframe(pdf)
+
+    def load_csv(self, file_name, **kwargs):
+        """
+        Appends a BOM from a csv file, kwargs are passed on to
+        pandas.read_csv.  Cells are read as strings by default and only
+        blank cells count as missing.
+        """
+        kwargs.setdefault('dtype', str)
+        kwargs.setdefault('keep_default_na', False)
+        kwargs.setdefault('na_values', [''])
+        self.load_dataframe(pd.read_csv(file_name, **kwargs))
+
+    def _index_rows(self, ColumnName, start, stop):
+        index = self._indexes[ColumnName]
+        duplicates = self._duplicates[ColumnName]
+        categories = self.bom_dom[ColumnName].categories
+        codes = self.bom_dom[ColumnName].codes[start:stop]
+        # Group the new rows by value first so the index is only touched once
+        # per distinct value
+        for code, rows in pd.Series(codes).groupby(
+                codes, sort=False).indices.items():
+            value = categories[code]
+            row_list = index.setdefault(value, [])
+            row_list.extend((rows + start).tolist())
+            # Blank cells are not duplicates of each other
+            if len(row_list) > 1 and value:
+                duplicates.add(value)
+
+    def rebuild_indexes(self):
+        self._indexes = {ColumnName: {}
+                         for ColumnName in self._indexed_columns}
+        self._duplicates = {ColumnName: set()
+                            for ColumnName in self._indexed_columns}
+        for ColumnName in self._indexed_columns:
+            self._index_rows(ColumnName, 0,
+                             self.bom_dom[ColumnName].item_count())
+
+    def find_rows(self, ColumnName, value):
+        """
+        Returns the row numbers whose ColumnName cell equals value.
+        ColumnName must be one of the indexed_columns.
+        """
+        return list(self._indexes[ColumnName].get(str(value).strip(), []))
+
+    def duplicates(self, ColumnName):
+        """
+        Returns {value: row numbers} for every value of an indexed column
+        that appears on more than one row, blank cells are left out.
+        """
+        index = self._indexes[ColumnName]
+        return {value: list(index[value])
+                for value in self._duplicates[ColumnName]}
+
+    def row(self, row_number):
+        return {ColumnName: self.bom_dom[ColumnName].categories[
+                    self.bom_dom[ColumnName].codes[row_number]]
+                for ColumnName in self.column_names_and_order}
+
+    def to_dataframe(self):
+        return pd.DataFrame({ColumnName:
+                             self.bom_dom[ColumnName].to_series()
+                             for ColumnName in self.column_names_and_order},
+                            columns=list(self.column_names_and_order))
+
 # Required imports if put in sepatate package
 # from Sochacki.SochackiUtilityPackage import AttrDict
 
@@ -136,6 +439,13 @@ class StringListCollector(object):
     It removes trailing and leading white space as the items it is intended
     to store should not have this but inevitibly will
 
+    The items are stored column wise and dictionary encoded, every distinct
+    string is kept once in a category list and the column itself is just an
+    array of integer codes into it.  BOM columns repeat the same few values
+    (manufacturer names, 'EAC', ...) over and over so this is several times
+    smaller than a list of separate string objects.  The codes and categories
+    can be handed to numpy or pandas as is.
+
     Parameters
     ----------
         is_empty : Bool
@@ -163,81 +473,192 @@ class StringListCollector(object):
     True
     >>> collector.item_count()
     0
-    >>> collector.items()
-    0
+    >>> collector.items
+    []
     >>> collector.items = 1231231
     >>> collector.is_empty()
     False
     >>> collector.item_count()
     1
-    >>> collector.items()
+    >>> collector.items
     ['1231231']
     >>> collector.items = 1233321
     >>> collector.item_count()
     2
-    >>> collector.items()
+    >>> collector.items
     ['1231231', '1233321']
     >>> collector.items = ' 1233321 whoops '
     >>> collector.item_count()
     3
-    >>> collector.items()
+    >>> collector.items
     ['1231231', '1233321', '1233321 whoops']
+    >>> collector.extend(pd.Series([' EAC', 'EAC ', 'LFT']))
+    >>> collector.categories
+    ['1231231', '1233321', '1233321 whoops', 'EAC', 'LFT']
+    >>> collector.codes
+    array([0, 1, 2, 3, 3, 4], dtype=int32)
+    >>> collector.to_series()
+    0           1231231
+    1           1233321
+    2    1233321 whoops
+    3               EAC
+    4               EAC
+    5               LFT
+    dtype: category
 
     TODO
     ----
     Nothing for now
     """
     def __init__(self):
-        self._items = []
+        self.reset()
 
     # Equivalent to a stack peek
     @property
     def items(self):
-        return self._items
+        return list(map(self._categories.__getitem__,
+                        self._codes[:self._item_count].tolist()))
 
     # Equivalent to a stack push
     @items.setter
     def items(self, new_value):
-        self._items.append(str(new_value).strip())
+        self._reserve(1)
+        self._codes[self._item_count] = self._encode(self._convert(new_value))
+        self._item_count += 1
+
+    def extend(self, new_values):
+        """
+        Bulk version of the items setter, every value is stored exactly as
+        assigning it to items would store it.  Strings in pandas Series,
+        Index and numpy arrays are only converted and looked up in the
+        category list once per distinct value.
+        """
+        if isinstance(new_values, (np.ndarray, pd.Index)):
+            new_values = pd.Series(new_values)
+        if isinstance(new_values, pd.Series):
+            dtype = new_values.dtype
+            if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+                # Factorized on the bits, 0.0 and -0.0 are equal but print
+                # differently
+                Bits = np.dtype('i{}'.format(dtype.itemsize))
+                codes, uniques = pd.factorize(
+                    new_values.to_numpy().view(Bits))
+                uniques = uniques.view(dtype)
+            else:
+                if not (isinstance(dtype, np.dtype) and dtype.kind in
+                        'biuMm') and pd.api.types.infer_dtype(
+                            new_values, skipna=True) not in \
+                        ('string', 'empty'):
+                    # Mixed objects are converted one by one, distinct
+                    # values can be equal and print differently (1 and 1.0)
+                    new_values = new_values.astype(object).map(self._convert)
+                codes, uniques = pd.factorize(new_values)
+            mapping = np.array([self._encode(self._convert(value))
+                                for value in uniques] + [0], dtype=np.int32)
+            codes = mapping[codes]
+            # Missing cells (None, nan) are left out by factorize
+            for position in np.flatnonzero(new_values.isna().values):
+                codes[position] = self._encode(
+                    self._convert(new_values.iloc[position]))
+        else:
+            codes = np.array([self._encode(self._convert(value))
+                              for value in new_values], dtype=np.int32)
+        self._reserve(len(codes))
+        self._codes[self._item_count:self._item_count + len(codes)] = codes
+        self._item_count += len(codes)
+
+    @staticmethod
+    def _convert(value):
+        # The one conversion every item goes through
+        return str(value).strip()
+
+    def _encode(self, value):
+        code = self._category_codes.get(value)
+        if code is None:
+            code = len(self._categories)
+            self._categories.append(value)
+            self._category_codes[value] = code
+        return code
+
+    def _reserve(self, count):
+        if self._item_count + count > len(self._codes):
+            codes = np.empty(max(16, self._item_count + count,
+                                 2 * len(self._codes)), dtype=np.int32)
+            codes[:self._item_count] = self._codes[:self._item_count]
+            self._codes = codes
+
+    @property
+    def codes(self):
+        """
+        The integer code of every item, a view onto the internal storage.
+        """
+        return self._codes[:self._item_count]
+
+    @property
+    def categories(self):
+        """
+        The distinct item values in the order they were first seen.
+        """
+        return self._categories
+
+    def to_numpy(self):
+        # The object array only holds references to the shared category
+        # strings, no strings are copied
+        return np.array(self._categories + [''],
+                        dtype=object)[:-1][self.codes]
+
+    def to_series(self, name=None):
+        return pd.Series(pd.Categorical.from_codes(self.codes,
+                                                   self._categories),
+                         name=name)
 
     def reset(self, *args):
-        self._items = []
+        self._codes = np.empty(0, dtype=np.int32)
+        self._item_count = 0
+        self._categories = []
+        self._category_codes = {}
 
     def is_empty(self):
-        return self.items == []
+        return self._item_count == 0
 
     def item_count(self):
-        return len(self.items)
+        return self._item_count
 
 
 class AttrDict(dict):
     """
-    This is an attribute dictionary.  It adds dictionary keys to its self
-    exposing them as attributes of the instance.  You can assign values
-    to the attributes and the dictionary entries are updated or vica versa.
-    Make sure that any sub attributes that you want to access from a
-    parent attribute using the instance.parent.child syntax is created
-    using an AttrDict.
-
-    >>> instance = AttrDict({'parent':AttrDict({'child':'val'})})
-    or
-    >>> instance = AttrDict({'parent':{}})
-    >>> instance.parent = AttrDict({'child':'val'})
+    This is an attribute dictionary.  It exposes the dictionary keys as
+    attributes of the instance.  You can assign values to the attributes
+    and the dictionary entries are updated or vica versa.
+    Plain dictionaries are converted to AttrDicts when they are stored
+    (instantiation, item or attribute assignment, update and setdefault) so
+    the instance.parent.child syntax works all the way down without having
+    to wrap every level by hand.  The conversion is a copy, later changes to
+    the plain dictionary that was passed in do not show up in the AttrDict.
+    Reading never converts or replaces anything, a value comes back exactly
+    as it is stored.
+
+    >>> instance = AttrDict({'parent': {'child': 'val'}})
+    >>> instance.parent.child
+    'val'
 
     The functionality comes from the following:
-        - All python objects internally store their attributes in a dictionary
-          that is named __dict__.
+        - Attribute lookups that are not found on the class (i.e. are not
+          dictionary methods) fall through to __getattr__ which looks the
+          name up as a key.
 
-        - There is no requirement that the internal dictionary __dict__ would
-          need to be "just a plain dict", so we can assign any subclass
-          of dict() to the internal dictionary.
+        - Attribute assignment and deletion are routed to the dictionary
+          items so attributes and items are always in sync.
 
-        - In our case we simply assign the AttrDict() instance we are
-          instantiating (as we are in __init__).
+        - Every way of storing a value goes through __setitem__, which is
+          where nested plain dictionaries are converted.
 
-        - By calling super()'s __init__() method we made sure that it
-          (already) behaves exactly like a dictionary,
-          since that function calls all the dictionary instantiation code.
+        - The class declares empty __slots__ so instances carry no per
+          instance __dict__ at all.  Earlier versions assigned the instance
+          to its own __dict__, which made every instance a reference cycle
+          that only the cyclic garbage collector could reclaim.  Now plain
+          reference counting frees them, which matters when millions of them
+          are created (e.g. one per BOM line or per detected object).
 
     Parameters
     ----------
@@ -253,66 +674,141 @@ class AttrDict(dict):
     {'foo': 'bar'}
     >>> attrinstance.bar = 'baz'
     >>> attrinstance
-    {'bar': 'baz', 'foo': 'bar'}
+    {'foo': 'bar', 'bar': 'baz'}
     >>> attrinstance.update({'foo': {'bar': 'baz'}})
     >>> attrinstance
-    {'bar': 'baz', 'foo': {'bar': 'baz'}}
+    {'foo': {'bar': 'baz'}, 'bar': 'baz'}
     >>> attrinstance.foo = {'bar': ['baz', 'huh?']}
-    >>> attrinstance
-    {'bar': 'baz', 'foo': {'bar': ['baz', 'huh?']}}
-    >>> attrinstance.foo
-    {'bar': ['baz', 'huh?']}
     >>> attrinstance.foo['bar']
     ['baz', 'huh?']
     >>> attrinstance.foo.bar
-    AttributeError: 'dict' object has no attribute 'bar'
-    >>> attrinstance.foo = AttrDict({'bar': ['baz', 'huh?']})
-    >>> attrinstance
-    {'bar': 'baz', 'foo': {'bar': ['baz', 'huh?']}}
-    >>> attrinstance.foo.bar
     ['baz', 'huh?']
+    >>> type(attrinstance.foo)
+    socHACKi.socHACKiUtilityPackage.AttrDict
+    >>> attrinstance.foo is attrinstance['foo']
+    True
+    >>> attrinstance.missing
+    AttributeError: 'AttrDict' object has no attribute 'missing'
 
     Info
     ----
 
-    The implementation used here is the preffered implementation over that over
-    the implementation below for the following reasons:
-
-        - No dictionary class methods are shadowed (e.g. .keys() work just fine)
+        - No dictionary class methods are shadowed (e.g. .keys() work just
+              fine even after instance.keys = {'dictkey':val}, the value is
+              still reachable as instance['keys'])
 
         - Attributes and items are always in sync
 
         - Trying to access non-existent key as an attribute correctly raises
               AttributeError instead of KeyError
 
-    >>> class AttributeDict(dict):
-    >>> def __getattr__(self, attr):
-    >>>     return self[attr]
-    >>> def __setattr__(self, attr, value):
-    >>>     self[attr] = value
+    See Also
+    --------
+    FrozenAttrDict for an immutable, hashable variant
+    """
+    __slots__ = ()
 
-    Warning
-    -------
+    def __init__(self, *args, **kwargs):
+        # Equivalent in later versions of python but left in the old fashion
+        # for backwards compadability
+        # super().__init__(*args, **kwargs)
+        super(AttrDict, self).__init__(*args, **kwargs)
+        for key, value in dict.items(self):
+            if type(value) is dict:
+                dict.__setitem__(self, key, AttrDict(value))
 
-    However it does have the following dissadvantages/issues
-    (some can be fixed) with a little extra work when you have the time
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError("'{}' object has no attribute '{}'".format(
+                type(self).__name__, name))
 
-        - Methods like .keys() will not work just fine if they get
-              overwritten by incoming data
-              (e.g. instance.keys = {'dictkey':val} will shadow dict.keys)
+    def __setattr__(self, name, value):
+        self[name] = value
 
-        - Causes a memory leak in Python < 2.7.4 / Python3 < 3.2.3
+    def __setitem__(self, key, value):
+        if type(value) is dict:
+            value = AttrDict(value)
+        super(AttrDict, self).__setitem__(key, value)
 
-        - Pylint goes bananas with E1123(unexpected-keyword-arg)
-              and E1103(maybe-no-member)
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
 
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __delattr__(self, name):
+        try:
+            del self[name]
+        except KeyError:
+            raise AttributeError("'{}' object has no attribute '{}'".format(
+                type(self).__name__, name))
+
+    def __dir__(self):
+        return list(dir(type(self))) + [key for key in self.keys()
+                                        if isinstance(key, str)]
+
+
+class FrozenAttrDict(AttrDict):
     """
+    This is an immutable and hashable AttrDict.  Nested dictionaries are
+    frozen as well when the instance is created.  It can be used as a
+    dictionary key or set member (provided all of its values are hashable)
+    for things like enums that must never change after they are made.
+
+    Example
+    -------
+
+    >>> frozen = FrozenAttrDict({'AgilentNALimitTypeOff': 0,
+    ...                          'AgilentNALimitTypeMaximum': 1})
+    >>> frozen.AgilentNALimitTypeMaximum
+    1
+    >>> frozen.AgilentNALimitTypeMaximum = 2
+    TypeError: 'FrozenAttrDict' object does not support item assignment
+    >>> {frozen: 'limit types'}
+    {{'AgilentNALimitTypeOff': 0, 'AgilentNALimitTypeMaximum': 1}: 'limit types'}
+    """
+    __slots__ = ('_hash',)
+
     def __init__(self, *args, **kwargs):
-        # Equivalent in later versions of python but left in the old fashion
-        # for backwards compadability
-        # super().__init__(*args, **kwargs)
-        super(AttrDict, self).__init__(*args, **kwargs)
-        self.__dict__ = self
+        super(FrozenAttrDict, self).__init__(*args, **kwargs)
+        for key, value in dict.items(self):
+            if isinstance(value, dict) and \
+                    not isinstance(value, FrozenAttrDict):
+                dict.__setitem__(self, key, FrozenAttrDict(value))
+        object.__setattr__(self, '_hash', None)
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, '_hash',
+                               hash(frozenset(dict.items(self))))
+        return self._hash
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("'{}' object does not support item "
+                        "assignment".format(type(self).__name__))
+
+    __setitem__ = _immutable
+    __delitem__ = _immutable
+    __setattr__ = _immutable
+    __delattr__ = _immutable
+    __ior__ = _immutable
+    clear = _immutable
+    pop = _immutable
+    popitem = _immutable
+    setdefault = _immutable
+    update = _immutable
 
 # Required imports if put in sepatate package
 # from tkinter import Tk
@@ -331,6 +827,12 @@ class TkUserListSelect(object):
     This is not for file or file path selection, there is another class
     for that
 
+    Items are shown shortest first.  Typing in the filter box narrows the
+    list to the items starting with what was typed (case insensitive) and
+    Return picks the selected item, or the first match if nothing is
+    selected.  The list box only ever holds the rows that are on screen, so
+    part lists with 100k entries open and scroll as fast as short ones.
+
     Example
     -------
     >>> user_list_box = TkUserListSelect(title='Title',
@@ -344,7 +846,7 @@ class TkUserListSelect(object):
     >>> user_list_box.open_frame()
     ...Interaction (user selects 'hi')
     >>> user_list_box.return_index()
-    1
+    2
     >>> user_list_box.return_index_value()
     'hi'
     >>> user_list_box.return_enum()
@@ -352,12 +854,21 @@ class TkUserListSelect(object):
     >>> user_list_box.return_value()
     'user doesnt see these'
     """
-    def __init__(self, title, message, user_enum):
+    def __init__(self, title, message, user_enum, visible_rows=10):
         self.master = Tk()
         self.value = None
+        self.index = None
+        self.index_value = None
         self._user_presented_list = list(user_enum.keys())
-        self._short_bubble_sort()
+        self._sort_by_length()
+        self._build_prefix_index()
         self._user_enum = user_enum
+        self._visible_rows = visible_rows
+        self._offset = 0
+        self._selected = None
+        self._filter_text = ''
+        self._filter_bounds = (0, len(self._prefix_keys))
+        self._visible_positions = range(len(self._user_presented_list))
         self._current_font_type = 'Times'
         self._current_font_size = 10
         self.font_obj = font.Font(font=(
@@ -380,18 +891,38 @@ class TkUserListSelect(object):
                 Label(self.modalPane, text=message)
             self.message_label.pack(padx=5, pady=5)
 
+        self.filter_text = StringVar(self.modalPane)
+        self.filterEntry = Entry(self.modalPane,
+                                 textvariable=self.filter_text)
+        self.filterEntry.pack(side=TOP, fill=X, padx=5)
+        self.filter_text.trace_add('write', self._filter_changed)
+
         listFrame = Frame(self.modalPane)
         listFrame.pack(side=TOP, padx=5, pady=5)
 
-        scrollBar = Scrollbar(listFrame)
-        scrollBar.pack(side=RIGHT, fill=Y)
-        self.listBox = Listbox(listFrame, selectmode=SINGLE)
+        # The scroll bar scrolls the whole (filtered) list while the list
+        # box only holds the rows on screen
+        self.scrollBar = Scrollbar(listFrame, command=self._scroll)
+        self.scrollBar.pack(side=RIGHT, fill=Y)
+        self.listBox = Listbox(listFrame, selectmode=SINGLE,
+                               height=visible_rows, exportselection=False)
         self.listBox.pack(side=LEFT, fill=Y)
-        scrollBar.config(command=self.listBox.yview)
-        self.listBox.config(yscrollcommand=scrollBar.set)
-        # self.list.sort()
-        for item in self._user_presented_list:
-            self.listBox.insert(END, item)
+        self.listBox.bind('<<ListboxSelect>>', self._select)
+        self.listBox.bind('<Up>', lambda event: self._move_selection(-1))
+        self.listBox.bind('<Down>', lambda event: self._move_selection(1))
+        self.listBox.bind('<Prior>', lambda event:
+                          self._move_selection(-self._visible_rows))
+        self.listBox.bind('<Next>', lambda event:
+                          self._move_selection(self._visible_rows))
+        self.listBox.bind('<MouseWheel>', lambda event:
+                          self._scroll('scroll', -event.delta // 120,
+                                       'units'))
+        self.listBox.bind('<Button-4>', lambda event:
+                          self._scroll('scroll', -1, 'units'))
+        self.listBox.bind('<Button-5>', lambda event:
+                          self._scroll('scroll', 1, 'units'))
+        self.filterEntry.bind('<Down>', lambda event:
+                              self._move_selection(1))
 
         buttonFrame = Frame(self.modalPane)
         buttonFrame.pack(side=BOTTOM)
@@ -404,6 +935,8 @@ class TkUserListSelect(object):
 
         self.set_font_size('Times', 10)
         self.autowidth(500)
+        self._render()
+        self.filterEntry.focus_set()
 
     def set_font_size(self, FONT_TYPE, FONT_SIZE):
         self._current_font_type = FONT_TYPE
@@ -415,44 +948,134 @@ class TkUserListSelect(object):
         self.listBox.config(font=(
                             self._current_font_type, self._current_font_size))
 
-    def autowidth(self, maxwidth):
+    def autowidth(self, maxwidth, sample_size=50):
+        # Only the longest items can set the width, measure those instead of
+        # every item
         pixels = 0
-        for item in self.listBox.get(0, "end"):
-            pixels = max(pixels, self.font_obj.measure(item))
-        # bump listbox size until all entries fit
+        for item in heapq.nlargest(sample_size, self._user_presented_list,
+                                   key=lambda item: len(str(item))):
+            pixels = max(pixels, self.font_obj.measure(str(item)))
+        # list box widths are in average character widths
         pixels = pixels + 10
+        character = max(self.font_obj.measure('0'), 1)
         width = int(self.listBox.cget("width"))
-        for w in range(0, maxwidth+1, 5):
-            if self.listBox.winfo_reqwidth() >= pixels:
-                break
-            self.listBox.config(width=width+w)
-
-    def _short_bubble_sort(self):
-        exchanges = True
-        passnum = len(self._user_presented_list) - 1
-        while (passnum > 0) and exchanges:
-            exchanges = False
-            for i in range(passnum):
-                try:
-                    if len(self._user_presented_list[i]) > \
-                          len(self._user_presented_list[i + 1]):
-                        exchanges = True
-                        self._user_presented_list[i], self._user_presented_list[i + 1] = \
-                        self._user_presented_list[i + 1], self._user_presented_list[i]
-                except TypeError as e:
-                    pass
-            passnum = passnum-1
+        self.listBox.config(width=min(max(width, -(-pixels // character)),
+                                      width + maxwidth))
+
+    def _sort_by_length(self):
+        # Shortest first, items of equal length keep their order
+        self._user_presented_list.sort(key=lambda item: len(str(item)))
+
+    def _build_prefix_index(self):
+        Keys = sorted((str(item).lower(), Position) for Position, item
+                      in enumerate(self._user_presented_list))
+        self._prefix_keys = [Key for Key, Position in Keys]
+        self._prefix_positions = [Position for Key, Position in Keys]
+
+    def matching_positions(self, prefix):
+        """
+        Positions in the presented list of the items starting with prefix,
+        in presented order.  Typing more characters only searches the range
+        the previous prefix matched.
+        """
+        prefix = prefix.lower()
+        if not prefix:
+            self._filter_text = ''
+            self._filter_bounds = (0, len(self._prefix_keys))
+            return range(len(self._user_presented_list))
+        if prefix.startswith(self._filter_text):
+            Low, High = self._filter_bounds
+        else:
+            Low, High = 0, len(self._prefix_keys)
+        Low = bisect_left(self._prefix_keys, prefix, Low, High)
+        High = bisect_left(self._prefix_keys, prefix + '\U0010ffff', Low,
+                           High)
+        self._filter_text = prefix
+        self._filter_bounds = (Low, High)
+        return sorted(self._prefix_positions[Low:High])
+
+    def _filter_changed(self, *args):
+        self._visible_positions = self.matching_positions(
+            self.filter_text.get())
+        self._offset = 0
+        self._selected = None
+        self._render()
+
+    def _render(self):
+        Count = len(self._visible_positions)
+        self._offset = max(0, min(self._offset, Count - self._visible_rows))
+        self.listBox.delete(0, END)
+        for Position in self._visible_positions[
+                self._offset:self._offset + self._visible_rows]:
+            self.listBox.insert(END, self._user_presented_list[Position])
+        if self._selected is not None:
+            Row = self._visible_row(self._selected)
+            if Row is not None and \
+                    self._offset <= Row < self._offset + self._visible_rows:
+                self.listBox.selection_set(Row - self._offset)
+        if Count:
+            self.scrollBar.set(self._offset / Count,
+                               min(self._offset + self._visible_rows, Count) /
+                               Count)
+        else:
+            self.scrollBar.set(0, 1)
+
+    def _visible_row(self, Position):
+        if isinstance(self._visible_positions, range):
+            return Position
+        Row = bisect_left(self._visible_positions, Position)
+        if Row < len(self._visible_positions) and \
+                self._visible_positions[Row] == Position:
+            return Row
+        return None
+
+    def _scroll(self, *args):
+        if args[0] == 'moveto':
+            self._offset = int(float(args[1]) *
+                               len(self._visible_positions))
+        elif args[0] == 'scroll':
+            Step = self._visible_rows if args[2] == 'pages' else 1
+            self._offset += int(args[1]) * Step
+        self._render()
+        return 'break'
+
+    def _select(self, event=None):
+        Selection = self.listBox.curselection()
+        if Selection:
+            self._selected = \
+                self._visible_positions[self._offset + int(Selection[0])]
+
+    def _move_selection(self, Step):
+        Count = len(self._visible_positions)
+        if not Count:
+            return 'break'
+        Row = None if self._selected is None \
+            else self._visible_row(self._selected)
+        Row = 0 if Row is None else max(0, min(Row + Step, Count - 1))
+        self._selected = self._visible_positions[Row]
+        # Keep the selected row on screen
+        if Row < self._offset:
+            self._offset = Row
+        elif Row >= self._offset + self._visible_rows:
+            self._offset = Row - self._visible_rows + 1
+        self.listBox.focus_set()
+        self._render()
+        return 'break'
 
     def open_frame(self):
         self.master.mainloop()
 
     def _choose(self, event=None):
-        try:
-            firstIndex = self.listBox.curselection()[0]
-            self.index = firstIndex
-            self.index_value = self._user_presented_list[int(firstIndex)]
-        except IndexError:
+        Position = self._selected
+        if Position is None and self._filter_text and \
+                len(self._visible_positions):
+            # Typed ahead without picking, take the best match
+            Position = self._visible_positions[0]
+        if Position is None:
             self.index_value = None
+        else:
+            self.index = Position
+            self.index_value = self._user_presented_list[Position]
         self.modalPane.destroy()
 
     def _cancel(self, event=None):
@@ -472,6 +1095,9 @@ class TkUserListSelect(object):
 
 # Required imports if put in sepatate package
 # import xml.dom.minidom
+# from xml.dom.minicompat import NodeList
+# from bisect import bisect_left
+# import functools
 
 
 class XMLMinidomNavigator(object):
@@ -484,7 +1110,7 @@ class XMLMinidomNavigator(object):
 
     Parameters
     ----------
-    xml_file_name : string (Path)
+    xml_file_name : string (Path) or file object
                     This is the full file name path to the xml file.
 
     Example
@@ -533,12 +1159,83 @@ class XMLMinidomNavigator(object):
     _xml_whitespace_identifier = ['#text']
 
     def __init__(self, xml_file_name):
+        # The file is parsed once, the base and sub trees start out as views
+        # onto the same document
+        if isinstance(xml_file_name, os.PathLike):
+            # minidom only opens str names itself
+            xml_file_name = os.fspath(xml_file_name)
         self._xml_dom_tree = xml.dom.minidom.parse(xml_file_name)
-        self._current_xml_dom_tree_bass = xml.dom.minidom.parse(xml_file_name)
-        self._current_xml_dom_sub_tree = xml.dom.minidom.parse(xml_file_name)
+        self.build_tag_index()
+        self._current_xml_dom_tree_bass = self._xml_dom_tree
+        self._current_xml_dom_sub_tree = self._xml_dom_tree
         self._xml_tag_list = self.get_complete_tag_list()
         self._current_element = None
 
+    def build_tag_index(self):
+        """
+        Walks the document once and records every element in document order
+        along with its parent and the end of its subtree.  Each tag name then
+        maps to the sorted positions of its elements, so finding all elements
+        with a tag under any element is a bisect instead of a tree walk.
+        """
+        elements = []
+        parent_positions = []
+        element_positions = {}
+        tag_index = {}
+        stack = [(Node, -1) for Node in reversed(self._xml_dom_tree.childNodes)
+                 if Node.nodeType == Node.ELEMENT_NODE]
+        while stack:
+            Node, Parent = stack.pop()
+            Position = len(elements)
+            elements.append(Node)
+            parent_positions.append(Parent)
+            element_positions[Node] = Position
+            tag_index.setdefault(Node.nodeName, []).append(Position)
+            stack.extend((Child, Position)
+                         for Child in reversed(Node.childNodes)
+                         if Child.nodeType == Child.ELEMENT_NODE)
+
+        # In document order every subtree is contiguous, so the end of an
+        # element's subtree is the furthest end of any of its descendants
+        subtree_ends = list(range(1, len(elements) + 1))
+        for Position in range(len(elements) - 1, -1, -1):
+            Parent = parent_positions[Position]
+            if Parent >= 0 and subtree_ends[Position] > subtree_ends[Parent]:
+                subtree_ends[Parent] = subtree_ends[Position]
+
+        self._elements = elements
+        self._parent_positions = parent_positions
+        self._element_positions = element_positions
+        self._subtree_ends = subtree_ends
+        self._tag_index = tag_index
+
+    def get_elements_by_tag_name(self, tag_name, element=None):
+        """
+        Index backed equivalent of element.getElementsByTagName(tag_name).
+        Searches the whole document when element is None.
+        """
+        if element is None or element is self._xml_dom_tree:
+            start, end = 0, len(self._elements)
+        else:
+            Position = self._element_positions.get(element)
+            if Position is None:
+                # Not an element of the indexed document
+                return element.getElementsByTagName(tag_name)
+            start, end = Position + 1, self._subtree_ends[Position]
+        if tag_name == '*':
+            return NodeList(self._elements[start:end])
+        positions = self._tag_index.get(tag_name, [])
+        return NodeList(self._elements[Position] for Position in
+                        positions[bisect_left(positions, start):
+                                  bisect_left(positions, end)])
+
+    def parent_element(self, element):
+        """
+        Returns the parent element of an element, None for the root.
+        """
+        Parent = self._parent_positions[self._element_positions[element]]
+        return None if Parent < 0 else self._elements[Parent]
+
     @property
     def xml_dom_tree(self):
         return self._xml_dom_tree
@@ -550,9 +1247,9 @@ class XMLMinidomNavigator(object):
     @current_xml_dom_tree_bass.setter
     def current_xml_dom_tree_bass(self, tag_name):
         self._current_xml_dom_tree_bass = \
-            self._xml_dom_tree.getElementsByTagName(tag_name)
+            self.get_elements_by_tag_name(tag_name)
         self._current_xml_dom_sub_tree = \
-            self._xml_dom_tree.getElementsByTagName(tag_name)
+            self.get_elements_by_tag_name(tag_name)
 
     @current_xml_dom_tree_bass.deleter
     def current_xml_dom_tree_bass(self):
@@ -638,7 +1335,7 @@ class XMLMinidomNavigator(object):
     @move_current_tree_to.setter
     def move_current_tree_to(self, NodeList):
         self.current_xml_dom_sub_tree = \
-            self.current_element.getElementsByTagName(NodeList)
+            self.get_elements_by_tag_name(NodeList, self.current_element)
 
     def all_current_child_nodes(self):
         try:
@@ -715,10 +1412,776 @@ class XMLMinidomNavigator(object):
             return True
 
     def get_complete_tag_list(self):
-        tag_list = set()
-        for Node in self.xml_dom_tree.getElementsByTagName('*'):
-            tag_list.add(Node.nodeName)
-        return list(tag_list)
+        return list(self._tag_index)
+
+    # A step is an axis, a name test and any predicates, e.g. //Shape[@ID='3']
+    _query_step = re.compile(
+        r"""\s*(//|/)?\s*(\.|\*|@[\w:.\-]+|text\(\)|[A-Za-z_][\w:.\-]*)"""
+        r"""((?:\[(?:[^\]'"]|'[^']*'|"[^"]*")*\])*)\s*""")
+    _query_predicate = re.compile(
+        r"""\[\s*(?:(\d+)|@([\w:.\-]+)(?:\s*(!=|=)\s*"""
+        r"""(?:'([^']*)'|"([^"]*)"))?)\s*\]""")
+
+    @classmethod
+    @functools.lru_cache(maxsize=1024)
+    def compile_query(cls, path):
+        """
+        Compiles a path expression into a tuple of steps.  The last 1024
+        paths compiled are cached, so a path used over and over is only
+        parsed the first time.
+
+        The supported subset of XPath is
+
+        - ``/`` (child) and ``//`` (descendant) steps, a path starting with
+          ``/`` is evaluated from the document, anything else from the
+          context given to query
+        - tag names (with prefix, e.g. ``vx:Ext``), ``*`` and ``.``
+        - predicates ``[@Name]``, ``[@Name='value']``, ``[@Name!='value']``
+          and ``[n]`` (1 based position among the siblings matched so far)
+        - a final ``/@Name`` or ``/text()`` step that returns attribute
+          values or element values instead of elements
+        """
+        steps = []
+        absolute = path.lstrip().startswith('/')
+        position = 0
+        while position < len(path):
+            match = cls._query_step.match(path, position)
+            if match is None or match.end() == position or \
+                    (match.group(1) is None and steps):
+                raise ValueError('Invalid path {!r} at character {}'.format(
+                    path, position))
+            axis, name, predicate_text = match.groups()
+            predicates = []
+            predicate_position = 0
+            while predicate_position < len(predicate_text):
+                predicate = cls._query_predicate.match(predicate_text,
+                                                       predicate_position)
+                if predicate is None:
+                    raise ValueError('Invalid predicate in path {!r}: {}'
+                                     .format(path, predicate_text))
+                number, attribute, operator, single, double = \
+                    predicate.groups()
+                if number is not None:
+                    if int(number) < 1:
+                        raise ValueError('Positions in path {!r} start at 1'
+                                         .format(path))
+                    predicates.append(('position', int(number)))
+                elif operator is None:
+                    predicates.append(('has', attribute))
+                else:
+                    predicates.append(
+                        (operator, attribute,
+                         single if single is not None else double))
+                predicate_position = predicate.end()
+            if name.startswith('@') or name == 'text()':
+                if axis == '//' or predicates or \
+                        match.end() != len(path):
+                    raise ValueError('{} must be the last step of path {!r} '
+                                     'and be a child step without predicates'
+                                     .format(name, path))
+            elif name == '.' and predicates:
+                raise ValueError('Predicates on . are not supported in path '
+                                 '{!r}'.format(path))
+            steps.append(('descendant' if axis == '//' else 'child', name,
+                          tuple(predicates)))
+            position = match.end()
+        if not steps:
+            raise ValueError('Empty path')
+
+        return (absolute, tuple(steps))
+
+    def query(self, path, context=None):
+        """
+        Evaluates a path expression (see compile_query) against the tag
+        index and returns every match in document order.
+
+        Parameters
+        ----------
+        path : string
+               The path expression.
+        context : Element, NodeList or list of Elements
+                  Where relative paths start, the whole document if None.
+
+        Example
+        -------
+
+        >>> visio_xml_dom.query("//Page[@NameU='Legend']//Shape/@ID")
+        ['1', '2', '5']
+        >>> visio_xml_dom.query("Prop[@NameU='Part']/Value/text()",
+        ...                     visio_xml_dom.query('//Shapes/Shape'))
+        ['PN-8', 'PN-36']
+
+        Returns
+        -------
+        NodeList of the matched elements, or a list of strings when the path
+        ends in /@Name or /text().
+        """
+        absolute, steps = self.compile_query(path)
+        if absolute or context is None or context is self._xml_dom_tree:
+            positions = [-1]
+        else:
+            if isinstance(context, xml.dom.minidom.Node):
+                context = [context]
+            try:
+                positions = sorted(set(self._element_positions[Node]
+                                       for Node in context))
+            except KeyError:
+                raise ValueError('The query context is not an element of '
+                                 'this document')
+
+        for axis, name, predicates in steps:
+            if name.startswith('@'):
+                return [self._elements[Position].getAttribute(name[1:])
+                        for Position in positions if Position >= 0 and
+                        self._elements[Position].hasAttribute(name[1:])]
+            if name == 'text()':
+                # Same value current_element_value gives for each element
+                return [self._elements[Position].firstChild.data
+                        for Position in positions if Position >= 0 and
+                        hasattr(self._elements[Position].firstChild, 'data')]
+            if name == '.':
+                if axis == 'descendant':
+                    positions = self._query_descendants(positions, '*',
+                                                        include_self=True)
+                continue
+            if axis == 'descendant':
+                positions = self._query_descendants(positions, name)
+            else:
+                positions = self._query_children(positions, name)
+            for predicate in predicates:
+                positions = self._query_filter(positions, predicate)
+        return NodeList(self._elements[Position] for Position in positions
+                        if Position >= 0)
+
+    def _query_span(self, Position):
+        if Position < 0:
+            return 0, len(self._elements)
+        return Position + 1, self._subtree_ends[Position]
+
+    def _query_candidates(self, name, start, end):
+        if name == '*':
+            return range(start, end)
+        positions = self._tag_index.get(name, [])
+        return positions[bisect_left(positions, start):
+                         bisect_left(positions, end)]
+
+    def _query_descendants(self, positions, name, include_self=False):
+        matches = []
+        last_end = -1
+        for Position in positions:
+            start, end = self._query_span(Position)
+            if start <= last_end:
+                # Nested in a context that was already searched
+                continue
+            if include_self and Position >= 0:
+                matches.append(Position)
+            matches.extend(self._query_candidates(name, start, end))
+            last_end = end
+        return matches
+
+    def _query_children(self, positions, name):
+        matches = []
+        last_end = -1
+        nested = False
+        parent_positions = self._parent_positions
+        for Position in positions:
+            start, end = self._query_span(Position)
+            nested = nested or start <= last_end
+            last_end = max(last_end, end)
+            matches.extend(Child for Child
+                           in self._query_candidates(name, start, end)
+                           if parent_positions[Child] == Position)
+        # Children of nested contexts interleave, restore document order
+        return sorted(matches) if nested else matches
+
+    def _query_filter(self, positions, predicate):
+        elements = self._elements
+        if predicate[0] == 'position':
+            counts = {}
+            matches = []
+            for Position in positions:
+                Parent = self._parent_positions[Position]
+                counts[Parent] = counts.get(Parent, 0) + 1
+                if counts[Parent] == predicate[1]:
+                    matches.append(Position)
+            return matches
+        if predicate[0] == 'has':
+            return [Position for Position in positions
+                    if elements[Position].hasAttribute(predicate[1])]
+        if predicate[0] == '=':
+            return [Position for Position in positions
+                    if elements[Position].hasAttribute(predicate[1]) and
+                    elements[Position].getAttribute(predicate[1]) ==
+                    predicate[2]]
+        return [Position for Position in positions
+                if elements[Position].hasAttribute(predicate[1]) and
+                elements[Position].getAttribute(predicate[1]) !=
+                predicate[2]]
+
+
+# Required imports if put in sepatate package
+# import xml.etree.ElementTree as ElementTree
+# from Sochacki.SochackiUtilityPackage import AttrDict
+
+
+class XMLIterparseNavigator(object):
+    """
+    This is the streaming counterpart of XMLMinidomNavigator for xml files
+    that are too big to hold as a DOM (e.g. multi hundred MB visio drawings).
+
+    The document is parsed incrementally and only the elements whose tag is
+    asked for are handed back, one at a time, with their attributes, text and
+    direct children.  Everything that has been handed back or is not needed
+    any more is cleared as the parse goes, so memory stays bounded by the
+    depth of the document rather than its size.
+
+    Tags are matched on their local name so the visio namespace does not have
+    to be spelled out.
+
+    Parameters
+    ----------
+    xml_source : string (Path) or file object
+                 The xml file to stream through.
+    tags : list of string
+           The tag names to hand back, e.g. ['Page', 'Shape', 'Prop'].
+
+    Example
+    -------
+
+    >>> visio_xml_stream = XMLIterparseNavigator('fullfilepath.xml',
+    ...                                          ['Shape', 'Prop'])
+    >>> for element in visio_xml_stream:
+    ...     print(element.tag, element.attributes, element.path)
+    Prop {'NameU': 'Part', 'ID': '1'} ('VisioDocument', 'Pages', 'Page',
+                                       'Shapes', 'Shape')
+    Shape {'ID': '5', 'Type': 'Shape'} ('VisioDocument', 'Pages', 'Page',
+                                        'Shapes')
+    >>> element.children
+    [{'tag': 'Value', 'attributes': {'Unit': 'STR'}, 'text': 'PN-12'},
+     {'tag': 'Label', 'attributes': {}, 'text': 'Part'}]
+    or
+    >>> for element in XMLIterparseNavigator('fullfilepath.xml').elements(
+    ...         'Page'):
+    ...     print(element.attributes['NameU'])
+
+    Returns
+    -------
+    Each element is an AttrDict with
+        tag : string
+              Local tag name
+        attributes : dict
+                     Attributes keyed by local name
+        text : string
+               Stripped text of the element, None if there is none
+        children : list of AttrDict
+                   tag, attributes and text of the direct child elements
+        path : tuple of string
+               Local tag names of the ancestors, root first
+    """
+
+    def __init__(self, xml_source, tags=None):
+        self._xml_source = xml_source
+        self._tags = None if tags is None else set(tags)
+
+    @property
+    def tags(self):
+        return self._tags
+
+    def __iter__(self):
+        return self.elements()
+
+    def elements(self, *tags):
+        """
+        Streams the elements with the given tag names, or the tags given at
+        construction if none are given here.
+        """
+        wanted = set(tags) if tags else self._tags
+        if not wanted:
+            raise ValueError('No tags were given to stream')
+        local_name = XMLIterparseNavigator.local_name
+        open_elements = []
+        open_tags = []
+        for Event, Element in ElementTree.iterparse(
+                self._xml_source, events=('start', 'end')):
+            if Event == 'start':
+                open_elements.append(Element)
+                open_tags.append(local_name(Element.tag))
+                continue
+
+            open_elements.pop()
+            Tag = open_tags.pop()
+            if Tag in wanted:
+                yield AttrDict(
+                    {'tag': Tag,
+                     'attributes': XMLIterparseNavigator._attributes(Element),
+                     'text': XMLIterparseNavigator._text(Element),
+                     'children': [
+                         AttrDict(
+                             {'tag': local_name(Child.tag),
+                              'attributes':
+                                  XMLIterparseNavigator._attributes(Child),
+                              'text': XMLIterparseNavigator._text(Child)})
+                         for Child in Element],
+                     'path': tuple(open_tags)})
+
+            # The children have been reported (or nobody asked for them) so
+            # they can go.  The element itself has to stay while its parent
+            # is a wanted element as it is one of that parent's children.
+            del Element[:]
+            if open_elements and open_tags[-1] not in wanted:
+                open_elements[-1].remove(Element)
+
+    @staticmethod
+    def local_name(tag):
+        return tag.rsplit('}', 1)[-1]
+
+    @staticmethod
+    def _attributes(Element):
+        return {XMLIterparseNavigator.local_name(Key): Value
+                for Key, Value in Element.attrib.items()}
+
+    @staticmethod
+    def _text(Element):
+        if Element.text is None:
+            return None
+        Text = Element.text.strip()
+        return Text if Text else None
+
+# Required imports if put in sepatate package
+# import hashlib
+# import json
+# import pickle
+# import sys
+# import os
+
+
+class FileContentCache(object):
+    """
+    This is an on disk cache for data that is slow to derive from a file
+    (converted workbooks, ...).
+
+    Entries are keyed by the content hash of the source file.  The path,
+    size and mtime of every file seen are kept in a manifest so an unchanged
+    file is not even re-hashed, and a file that was only touched (new mtime,
+    same content) still hits.  When a file's content changes its old entries
+    are dropped.  The total size of the cache is bounded and the least
+    recently used entries are evicted first, files left without any entries
+    are dropped from the manifest at the same time.
+
+    Subclasses decide what gets stored, this class only handles bytes.
+
+    Parameters
+    ----------
+    cache_directory : string (Path)
+                      Where the cache lives, defaults to
+                      ~/.socHACKi/<cache_name>
+    max_cache_size : int
+                     Upper bound of the total size of the entries in bytes
+
+    Example
+    -------
+    >>> cache = FileContentCache()
+    >>> cache.put('fullfilepath.xlsx', b'derived data')
+    >>> cache.get('fullfilepath.xlsx')
+    b'derived data'
+    """
+    cache_name = 'file_cache'
+    _cache_version = 1
+    _manifest_name = 'manifest.json'
+    _entry_extension = '.cache'
+
+    def __init__(self, cache_directory=None, max_cache_size=1024 ** 3):
+        if cache_directory is None:
+            cache_directory = os.path.join(os.path.expanduser('~'),
+                                           '.socHACKi', self.cache_name)
+        self._cache_directory = cache_directory
+        self._max_cache_size = max_cache_size
+        os.makedirs(self._cache_directory, exist_ok=True)
+        try:
+            with open(os.path.join(self._cache_directory,
+                                   self._manifest_name)) as ManifestFile:
+                self._manifest = json.load(ManifestFile)
+        except (IOError, ValueError):
+            self._manifest = {}
+        self._manifest_changed = False
+
+    @property
+    def cache_directory(self):
+        return self._cache_directory
+
+    @property
+    def max_cache_size(self):
+        return self._max_cache_size
+
+    @max_cache_size.setter
+    def max_cache_size(self, NewValue):
+        self._max_cache_size = NewValue
+        self.evict()
+
+    def content_hash(self, file_name):
+        file_name = os.path.normcase(os.path.abspath(file_name))
+        FileStat = os.stat(file_name)
+        Entry = self._manifest.get(file_name)
+        if Entry is not None and Entry[0] == FileStat.st_size and \
+                Entry[1] == FileStat.st_mtime_ns:
+            return Entry[2]
+
+        Hash = hashlib.sha1()
+        with open(file_name, 'rb') as SourceFile:
+            for Chunk in iter(lambda: SourceFile.read(1 << 20), b''):
+                Hash.update(Chunk)
+        ContentHash = Hash.hexdigest()
+
+        if Entry is not None and Entry[2] != ContentHash and \
+                not any(Other[2] == Entry[2]
+                        for Path, Other in self._manifest.items()
+                        if Path != file_name):
+            # The file changed, nothing derived from the old content can be
+            # reached any more
+            for EntryName in os.listdir(self._cache_directory):
+                if EntryName.startswith(Entry[2] + '-'):
+                    self._remove(EntryName)
+        self._manifest[file_name] = [FileStat.st_size, FileStat.st_mtime_ns,
+                                     ContentHash]
+        # Written once by get or put, not for every hash
+        self._manifest_changed = True
+        return ContentHash
+
+    def key(self, file_name, *options):
+        # Options (sheet names, reader arguments, ...) and the python version
+        # (pickle format) are part of the key
+        OptionHash = hashlib.sha1(repr(
+            (options, self._cache_version, sys.version_info[:2])).encode(
+                'utf-8')).hexdigest()[:16]
+        return '{}-{}'.format(self.content_hash(file_name), OptionHash)
+
+    def get(self, file_name, *options):
+        EntryPath = os.path.join(self._cache_directory,
+                                 self.key(file_name, *options) +
+                                 self._entry_extension)
+        try:
+            with open(EntryPath, 'rb') as EntryFile:
+                Payload = EntryFile.read()
+        except IOError:
+            self._flush_manifest()
+            return None
+        # Touch the entry so eviction sees it as recently used
+        os.utime(EntryPath, None)
+        self._flush_manifest()
+        return Payload
+
+    def put(self, file_name, payload, *options):
+        EntryPath = os.path.join(self._cache_directory,
+                                 self.key(file_name, *options) +
+                                 self._entry_extension)
+        TemporaryPath = '{}.{}.tmp'.format(EntryPath, os.getpid())
+        with open(TemporaryPath, 'wb') as EntryFile:
+            EntryFile.write(payload)
+        os.replace(TemporaryPath, EntryPath)
+        self.evict()
+
+    def evict(self):
+        Entries = []
+        for EntryName in os.listdir(self._cache_directory):
+            if EntryName.endswith(self._entry_extension):
+                EntryStat = os.stat(os.path.join(self._cache_directory,
+                                                 EntryName))
+                Entries.append((EntryStat.st_mtime, EntryStat.st_size,
+                                EntryName))
+        TotalSize = sum(Entry[1] for Entry in Entries)
+        Remaining = set(Entry[2] for Entry in Entries)
+        for EntryTime, EntrySize, EntryName in sorted(Entries):
+            if TotalSize <= self._max_cache_size:
+                break
+            self._remove(EntryName)
+            Remaining.discard(EntryName)
+            TotalSize -= EntrySize
+
+        # A file with nothing left in the cache (evicted, changed, deleted)
+        # only costs a hash the next time it is seen
+        LiveHashes = set(EntryName.split('-', 1)[0]
+                         for EntryName in Remaining)
+        for Path in [Path for Path, Entry in self._manifest.items()
+                     if Entry[2] not in LiveHashes]:
+            del self._manifest[Path]
+            self._manifest_changed = True
+        self._flush_manifest()
+
+    def clear(self):
+        for EntryName in os.listdir(self._cache_directory):
+            if EntryName.endswith(self._entry_extension):
+                self._remove(EntryName)
+        self._manifest = {}
+        self._manifest_changed = True
+        self._flush_manifest()
+
+    def _remove(self, EntryName):
+        try:
+            os.remove(os.path.join(self._cache_directory, EntryName))
+        except OSError:
+            pass
+
+    def _flush_manifest(self):
+        if not self._manifest_changed:
+            return
+        self._manifest_changed = False
+        ManifestPath = os.path.join(self._cache_directory,
+                                    self._manifest_name)
+        TemporaryPath = '{}.{}.tmp'.format(ManifestPath, os.getpid())
+        with open(TemporaryPath, 'w') as ManifestFile:
+            json.dump(self._manifest, ManifestFile)
+        os.replace(TemporaryPath, ManifestPath)
+
+
+class ExcelCache(FileContentCache):
+    """
+    This is the FileContentCache for pandas.read_excel.  The first read of a
+    workbook sheet (with a given set of read_excel arguments) is parsed by
+    pandas as usual and the resulting DataFrame is kept on disk, later reads
+    of the unchanged file load it back instead of parsing the workbook again.
+    Editing or replacing the workbook changes its content hash and drops the
+    old entries.
+
+    Frames are stored as pickles (protocol 5).  Agile and BOM exports have
+    object columns that mix strings, numbers and dates, which the columnar
+    formats would have to coerce, while a pickle gives back exactly the
+    frame read_excel returned.
+
+    Example
+    -------
+    >>> excel_cache = ExcelCache()
+    >>> agile_pdf = excel_cache.read_excel('agile_export.xlsx',
+    ...                                    sheet_name='BOM', dtype=str)
+    >>> human_bom = HRBOMInformation()
+    >>> human_bom.load_excel('human_bom.xlsx', cache=excel_cache)
+    """
+    cache_name = 'excel_cache'
+
+    def read_excel(self, file_name, sheet_name=0, **kwargs):
+        """
+        pandas.read_excel through the cache.  Anything but a path to an
+        existing file (buffers, urls) is read directly.
+        """
+        if isinstance(file_name, os.PathLike):
+            file_name = os.fspath(file_name)
+        if not isinstance(file_name, str) or not os.path.isfile(file_name):
+            return pd.read_excel(file_name, sheet_name=sheet_name, **kwargs)
+        # Arguments that don't repr the same way every run (converters,
+        # ...) simply never hit
+        Options = (sheet_name, sorted((Key, repr(Value))
+                                      for Key, Value in kwargs.items()),
+                   pd.__version__)
+        Payload = self.get(file_name, Options)
+        if Payload is not None:
+            try:
+                return pickle.loads(Payload)
+            except Exception:
+                pass
+        Frame = pd.read_excel(file_name, sheet_name=sheet_name, **kwargs)
+        self.put(file_name, pickle.dumps(Frame, 5), Options)
+        return Frame
+
+# Required imports if put in sepatate package
+# import zipfile
+# import posixpath
+# from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+# import xml.etree.ElementTree as ElementTree
+# from Sochacki.SochackiUtilityPackage import AttrDict
+# from Sochacki.SochackiUtilityPackage import XMLMinidomNavigator
+# from Sochacki.SochackiUtilityPackage import XMLIterparseNavigator
+
+
+def _visio_package_part_worker(vsdx_file_name, part_name, function,
+                               streaming, tags):
+    # Module level so it can be sent to worker processes, every worker opens
+    # its own handle on the package
+    with zipfile.ZipFile(vsdx_file_name) as Package:
+        with Package.open(part_name) as PartFile:
+            if streaming:
+                return function(XMLIterparseNavigator(PartFile, tags))
+            return function(XMLMinidomNavigator(PartFile))
+
+
+class VisioPackageReader(object):
+    """
+    This reads the xml parts of a .vsdx drawing straight out of the zip
+    (OPC) package, nothing is extracted to disk.  Parts are handed to
+    XMLMinidomNavigator or, for big pages, streamed through
+    XMLIterparseNavigator, and whole sets of pages can be processed in
+    parallel.
+
+    Pages and masters are listed in drawing order from pages.xml and
+    masters.xml and can be referred to by part name (visio/pages/page1.xml),
+    name or universal name.
+
+    Parameters
+    ----------
+    vsdx_file_name : string (Path)
+                     This is the full file name path to the .vsdx file.
+
+    Example
+    -------
+
+    >>> visio_package = VisioPackageReader('fullfilepath.vsdx')
+    >>> [page.name for page in visio_package.pages]
+    ['Legend', 'Page-2']
+    >>> legend = visio_package.navigator('Legend')
+    >>> legend.query("//Shape[@Master='4']/@ID")
+    ['3', '7']
+    >>> for element in visio_package.elements('Page-2', 'Shape'):
+    ...     print(element.attributes['ID'])
+    >>> def shape_count(navigator):
+    ...     return len(navigator.get_elements_by_tag_name('Shape'))
+    >>> visio_package.map_parts(shape_count)
+    [12, 30]
+
+    Warning
+    -------
+    With use_processes=True the function given to map_parts has to be
+    importable (defined at module level) and return something picklable,
+    and on Windows the calling script needs an
+    ``if __name__ == '__main__':`` guard.
+    """
+    _relationship_namespace = \
+        'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+    def __init__(self, vsdx_file_name):
+        self._vsdx_file_name = vsdx_file_name
+        with zipfile.ZipFile(vsdx_file_name) as Package:
+            self._part_names = Package.namelist()
+            self._pages = self._read_part_list(Package, 'visio/pages',
+                                               'pages.xml', 'Page')
+            self._masters = self._read_part_list(Package, 'visio/masters',
+                                                 'masters.xml', 'Master')
+
+    @property
+    def vsdx_file_name(self):
+        return self._vsdx_file_name
+
+    @property
+    def part_names(self):
+        return self._part_names
+
+    @property
+    def pages(self):
+        return self._pages
+
+    @property
+    def masters(self):
+        return self._masters
+
+    @property
+    def page_parts(self):
+        return [Page.part for Page in self._pages]
+
+    @property
+    def master_parts(self):
+        return [Master.part for Master in self._masters]
+
+    def part_name(self, name):
+        """
+        Returns the part name for a part name, page or master name.
+        """
+        if name in self._part_names:
+            return name
+        for Entry in self._pages + self._masters:
+            if name in (Entry.name, Entry.name_u):
+                return Entry.part
+        raise KeyError('{} is not a part, page or master of {}'.format(
+            name, self._vsdx_file_name))
+
+    def read_part(self, name):
+        with zipfile.ZipFile(self._vsdx_file_name) as Package:
+            return Package.read(self.part_name(name))
+
+    def navigator(self, name):
+        """
+        Returns an XMLMinidomNavigator over the part.
+        """
+        return _visio_package_part_worker(self._vsdx_file_name,
+                                          self.part_name(name),
+                                          lambda Navigator: Navigator,
+                                          False, None)
+
+    def elements(self, name, *tags):
+        """
+        Streams the elements of the part through XMLIterparseNavigator.
+        """
+        with zipfile.ZipFile(self._vsdx_file_name) as Package:
+            with Package.open(self.part_name(name)) as PartFile:
+                for Element in XMLIterparseNavigator(PartFile, tags):
+                    yield Element
+
+    def map_parts(self, function, names=None, streaming=False, tags=None,
+                  max_workers=None, use_processes=False):
+        """
+        Calls function on a navigator for each part, in parallel, and returns
+        the results in the order of names (all pages by default).
+
+        Parameters
+        ----------
+        function : callable
+                   Takes an XMLMinidomNavigator, or an XMLIterparseNavigator
+                   when streaming is True.
+        names : list of string
+                Part, page or master names.
+        streaming : bool
+                    Stream the parts instead of building a DOM.
+        tags : list of string
+               The tags to stream when streaming is True.
+        max_workers : int
+                      Size of the pool.
+        use_processes : bool
+                        Parsing holds the GIL, so use a process pool when
+                        the pages are big enough to be worth sending to
+                        other processes.
+        """
+        if names is None:
+            names = self.page_parts
+        part_names = [self.part_name(Name) for Name in names]
+        Executor = ProcessPoolExecutor if use_processes \
+            else ThreadPoolExecutor
+        with Executor(max_workers=max_workers) as Pool:
+            Futures = [Pool.submit(_visio_package_part_worker,
+                                   self._vsdx_file_name, PartName, function,
+                                   streaming, tags)
+                       for PartName in part_names]
+            return [Future.result() for Future in Futures]
+
+    def _read_part_list(self, Package, directory, list_name, tag):
+        list_part = posixpath.join(directory, list_name)
+        rels_part = posixpath.join(directory, '_rels', list_name + '.rels')
+        if list_part not in self._part_names:
+            # No list, fall back to the numbered parts
+            Parts = [Name for Name in self._part_names
+                     if posixpath.dirname(Name) == directory and
+                     Name != list_part and Name.endswith('.xml')]
+            Parts.sort(key=lambda Name: (len(Name), Name))
+            return [AttrDict(id=None, name=None, name_u=None, part=Name)
+                    for Name in Parts]
+
+        Targets = {}
+        if rels_part in self._part_names:
+            for Relationship in ElementTree.fromstring(
+                    Package.read(rels_part)):
+                Targets[Relationship.get('Id')] = posixpath.normpath(
+                    posixpath.join(directory, Relationship.get('Target')))
+
+        Entries = []
+        for Element in ElementTree.fromstring(Package.read(list_part)):
+            if XMLIterparseNavigator.local_name(Element.tag) != tag:
+                continue
+            Part = None
+            for Child in Element:
+                if XMLIterparseNavigator.local_name(Child.tag) == 'Rel':
+                    Part = Targets.get(Child.get(
+                        '{{{}}}id'.format(self._relationship_namespace)))
+            Entries.append(AttrDict(id=Element.get('ID'),
+                                    name=Element.get('Name'),
+                                    name_u=Element.get('NameU'),
+                                    part=Part))
+        return Entries
+
 
 #class XMLMinidomNavigator(object):
 #    """
@@ -870,12 +2333,667 @@ class XMLMinidomNavigator(object):
 ##        # import os
 
 
+# Required imports if put in sepatate package
+# import os
+# import struct
+# import ctypes
+# import ctypes.util
+
+
+class InotifyDirectoryWatcher(object):
+    """
+    This watches directories with Linux inotify (through ctypes, there is
+    nothing to install) and reports which of them had entries created,
+    deleted or renamed since the last call to changed_directories.
+
+    FileSystemIndex uses it so a refresh only looks at those directories
+    instead of stat'ing the whole tree.
+
+    Parameters
+    ----------
+    directories : list of string (Path)
+                  Directories to watch right away.
+
+    Example
+    -------
+
+    >>> watcher = InotifyDirectoryWatcher(['/data/projects'])
+    >>> watcher.changed_directories()
+    ['/data/projects']
+
+    Warning
+    -------
+    Raises OSError where inotify is not available (Windows, macOS).  Every
+    directory takes one watch out of fs.inotify.max_user_watches.
+    """
+    _IN_MOVED_FROM = 0x00000040
+    _IN_MOVED_TO = 0x00000080
+    _IN_CREATE = 0x00000100
+    _IN_DELETE = 0x00000200
+    _IN_DELETE_SELF = 0x00000400
+    _IN_MOVE_SELF = 0x00000800
+    _IN_Q_OVERFLOW = 0x00004000
+    _IN_IGNORED = 0x00008000
+    _IN_ONLYDIR = 0x01000000
+    _IN_NONBLOCK = 0o4000
+    _IN_CLOEXEC = 0o2000000
+    _watch_mask = (_IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE |
+                   _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR)
+    _event_header = struct.Struct('iIII')
+
+    def __init__(self, directories=()):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on Linux')
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'),
+                                 use_errno=True)
+        self._file_descriptor = self._libc.inotify_init1(
+            self._IN_NONBLOCK | self._IN_CLOEXEC)
+        if self._file_descriptor < 0:
+            Error = ctypes.get_errno()
+            raise OSError(Error, os.strerror(Error))
+        self._paths = {}
+        self._descriptors = {}
+        try:
+            for Directory in directories:
+                self.add(Directory)
+        except OSError:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def directories(self):
+        return list(self._descriptors)
+
+    def add(self, directory):
+        if directory in self._descriptors:
+            return
+        Descriptor = self._libc.inotify_add_watch(
+            self._file_descriptor, os.fsencode(directory), self._watch_mask)
+        if Descriptor < 0:
+            Error = ctypes.get_errno()
+            raise OSError(Error, os.strerror(Error), directory)
+        self._paths[Descriptor] = directory
+        self._descriptors[directory] = Descriptor
+
+    def remove(self, directory):
+        Descriptor = self._descriptors.pop(directory, None)
+        if Descriptor is not None:
+            self._paths.pop(Descriptor, None)
+            # Fails harmlessly when the kernel already dropped the watch
+            self._libc.inotify_rm_watch(self._file_descriptor, Descriptor)
+
+    def changed_directories(self):
+        """
+        Returns the watched directories that changed since the last call,
+        or None if the kernel queue overflowed and anything may have changed.
+        """
+        changed = {}
+        overflowed = False
+        while True:
+            try:
+                Buffer = os.read(self._file_descriptor, 1 << 16)
+            except BlockingIOError:
+                break
+            Offset = 0
+            while Offset < len(Buffer):
+                Descriptor, Mask, Cookie, NameLength = \
+                    self._event_header.unpack_from(Buffer, Offset)
+                Offset += self._event_header.size + NameLength
+                if Mask & self._IN_Q_OVERFLOW:
+                    overflowed = True
+                    continue
+                Path = self._paths.get(Descriptor)
+                if Path is None:
+                    continue
+                if Mask & self._IN_IGNORED:
+                    # The directory is gone, its parent reports the change
+                    self._paths.pop(Descriptor, None)
+                    self._descriptors.pop(Path, None)
+                    continue
+                changed[Path] = None
+        return None if overflowed else list(changed)
+
+    def close(self):
+        if self._file_descriptor >= 0:
+            os.close(self._file_descriptor)
+            self._file_descriptor = -1
+            self._paths = {}
+            self._descriptors = {}
+
+
+# Required imports if put in sepatate package
+# import os
+# import zlib
+# import marshal
+# from fnmatch import fnmatch
+# from concurrent.futures import ThreadPoolExecutor
+# from Sochacki.SochackiUtilityPackage import AttrDict
+
+
+class FileSystemIndex(object):
+    """
+    This is an index of a directory tree.  Every directory is listed once
+    with os.scandir and its files and sub directories are indexed by
+    extension, file name and directory name, so lookups are dictionary hits
+    instead of scans over the whole tree.
+
+    Each directory keeps the mtime it had when it was listed.  A directory's
+    mtime changes whenever an entry is added, removed or renamed in it, so
+    refresh only lists the directories whose mtime moved (and any new sub
+    directories), everything else is a single stat.  With watch on Linux
+    the stat'ing is skipped too, inotify reports which directories changed.
+
+    Listing and stat calls run on a bounded thread pool, which is what makes
+    the difference on network drives where every directory is a round trip.
+    Listings are merged into the index in os.walk order.
+
+    Parameters
+    ----------
+    root_directory : string (Path)
+                     The top of the tree, defaults to the current working
+                     directory.
+    build : bool
+            Scan the tree right away.
+    max_workers : int
+                  Number of directories listed at the same time, 1 lists
+                  them one after the other.
+    max_depth : int
+                Deepest directory level that is listed, the root is level 0.
+                None for no limit.
+    exclude : list of string
+              fnmatch patterns ('.git', '*_old') for directory names that are
+              not descended into.  They are still listed as sub directories
+              of their parent, like links to directories.
+
+    Example
+    -------
+
+    >>> file_index = FileSystemIndex('Z:\\Projects', max_workers=16,
+    ...                              exclude=['.git', 'Archive*'])
+    >>> file_index.files_with_extension('.xlsx')
+    ['Z:\\Projects\\BOM.xlsx', 'Z:\\Projects\\Results\\Phase.xlsx']
+    >>> file_index.directories_named('Results')
+    ['Z:\\Projects\\Results']
+    >>> file_index.save_snapshot('projects.index')
+    and in the next script
+    >>> file_index = FileSystemIndex('Z:\\Projects', build=False,
+    ...                              max_workers=16,
+    ...                              exclude=['.git', 'Archive*'])
+    >>> file_index.load_snapshot('projects.index')
+    True
+    >>> file_index.refresh()
+    ['Z:\\Projects\\Results']
+    >>> file_index.watch()
+    True
+
+    Warning
+    -------
+    Changes to the contents of a file do not change its directory's mtime,
+    the index only tracks which files and directories exist.
+    """
+    _snapshot_version = 2
+
+    def __init__(self, root_directory=None, build=True, max_workers=8,
+                 max_depth=None, exclude=None):
+        if root_directory is None:
+            root_directory = os.getcwd()
+        self._root_directory = os.path.abspath(root_directory)
+        self._max_workers = max_workers
+        self._max_depth = max_depth
+        self._exclude = tuple(exclude or ())
+        self._watcher = None
+        self.clear()
+        if build:
+            self.build()
+
+    @property
+    def root_directory(self):
+        return self._root_directory
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    @property
+    def max_depth(self):
+        return self._max_depth
+
+    @property
+    def exclude(self):
+        return self._exclude
+
+    @property
+    def watching(self):
+        return self._watcher is not None
+
+    @property
+    def directory_count(self):
+        return len(self._directories)
+
+    @property
+    def file_count(self):
+        return sum(len(Record[2]) for Record in self._directories.values())
+
+    def clear(self):
+        # full path -> (mtime_ns, sub directory names, file names)
+        if self._watcher is not None:
+            for Path in self._directories:
+                self._watcher.remove(Path)
+        self._directories = {}
+        self._extension_index = {}
+        self._file_name_index = {}
+        self._directory_name_index = {}
+        # directory -> position in os.walk order, built when first needed
+        self._walk_order = None
+
+    def build(self, callback=None):
+        """
+        Indexes the whole tree from scratch.
+
+        Parameters
+        ----------
+        callback : callable
+                   Called as callback(path, sub_directories, files) for
+                   every directory as soon as its listing is merged.
+        """
+        self.clear()
+        try:
+            mtime_ns = os.stat(self._root_directory).st_mtime_ns
+        except OSError:
+            return
+        self._index_entry(self._directory_name_index,
+                          os.path.basename(self._root_directory),
+                          self._root_directory)
+        self._add_directories([(self._root_directory, mtime_ns)], callback)
+
+    def refresh(self, callback=None, directories=None):
+        """
+        Lists again the directories whose mtime changed, drops the ones that
+        are gone and indexes new ones.
+
+        Parameters
+        ----------
+        directories : list of string (Path)
+                      Only check these, all indexed directories if None (or
+                      the ones inotify reported when watching).
+
+        Returns
+        -------
+        List of the directories that were listed again.
+        """
+        if directories is None and self._watcher is not None:
+            directories = self._watcher.changed_directories()
+        if directories is None:
+            Paths = list(self._directories)
+        else:
+            Paths = [Path for Path in directories
+                     if Path in self._directories]
+        if self._max_workers == 1:
+            mtimes = [self._stat_mtime_ns(Path) for Path in Paths]
+        else:
+            with ThreadPoolExecutor(self._max_workers) as Pool:
+                mtimes = list(Pool.map(self._stat_mtime_ns, Paths))
+
+        changed = []
+        for Path, mtime_ns in zip(Paths, mtimes):
+            Record = self._directories.get(Path)
+            if Record is None:
+                # Went with a parent that was removed
+                continue
+            if mtime_ns is None:
+                self._remove_directory(Path)
+            elif mtime_ns != Record[0]:
+                changed.append(Path)
+                self._update_directory(Path, mtime_ns, callback)
+        return changed
+
+    def watch(self):
+        """
+        Starts watching every indexed directory with inotify, later
+        refreshes then only look at the directories that reported changes.
+        Returns False (and refreshes keep stat'ing) where inotify is not
+        available or runs out of watches.
+        """
+        if self._watcher is not None:
+            return True
+        try:
+            self._watcher = InotifyDirectoryWatcher(self._directories)
+        except (OSError, AttributeError):
+            self._watcher = None
+            return False
+        return True
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+
+    def save_snapshot(self, file_name):
+        """
+        Writes the directory listings to file_name so a later run can
+        load_snapshot and refresh instead of crawling the whole tree.
+
+        The snapshot is a zlib compressed marshal of flat columns with the
+        paths stored relative to the root.
+        """
+        RootLength = len(self._root_directory)
+        Paths = [Path[RootLength:] for Path in self._directories]
+        Records = list(self._directories.values())
+        Payload = marshal.dumps(
+            (self._snapshot_version, self._root_directory, self._max_depth,
+             self._exclude, Paths, [Record[0] for Record in Records],
+             [Record[1] for Record in Records],
+             [Record[2] for Record in Records]))
+        TemporaryName = '{}.{}.tmp'.format(file_name, os.getpid())
+        with open(TemporaryName, 'wb') as SnapshotFile:
+            SnapshotFile.write(zlib.compress(Payload, 1))
+        os.replace(TemporaryName, file_name)
+
+    def load_snapshot(self, file_name):
+        """
+        Replaces the index with a snapshot taken by save_snapshot.  Nothing
+        is loaded (False is returned) if the file is missing, unreadable or
+        was taken for another root or other filters.
+        """
+        try:
+            with open(file_name, 'rb') as SnapshotFile:
+                Snapshot = marshal.loads(zlib.decompress(SnapshotFile.read()))
+        except (IOError, EOFError, zlib.error, ValueError, TypeError):
+            return False
+        if not isinstance(Snapshot, tuple) or len(Snapshot) != 8 or \
+                Snapshot[:4] != (self._snapshot_version, self._root_directory,
+                                 self._max_depth, self._exclude):
+            return False
+        Root = self._root_directory
+        self._load_directories(
+            {Root + Path: (mtime_ns, sub_directories, files)
+             for Path, mtime_ns, sub_directories, files
+             in zip(*Snapshot[4:])})
+        return True
+
+    def files_with_extension(self, extension):
+        """
+        Full paths of the files whose name ends in extension ('.xlsx'), in
+        os.walk order.
+        """
+        if extension.rfind('.') == 0:
+            return self.in_walk_order(
+                self._extension_index.get(extension, ()))
+        # Compound extensions ('.tar.gz', 'BOM.xlsx') are matched by name
+        return self.in_walk_order(
+            [Path for Paths in self._extension_index.values()
+             for Path in Paths if Path.endswith(extension)])
+
+    def files_named(self, file_name):
+        return self.in_walk_order(self._file_name_index.get(file_name, ()))
+
+    def directories_named(self, directory_name):
+        """
+        Full paths of the directories called directory_name, in os.walk
+        order, including links to directories which are listed but not
+        indexed themselves.  A name with separators ('Results/Phase') matches
+        the trailing path components.
+        """
+        directory_name = os.path.normpath(directory_name)
+        Paths = self._directory_name_index.get(
+            os.path.basename(directory_name), ())
+        if os.sep not in directory_name:
+            return self.in_walk_order(Paths)
+        return self.in_walk_order([Path for Path in Paths
+                                   if Path.endswith(os.sep + directory_name)])
+
+    def in_walk_order(self, full_paths):
+        """
+        Sorts indexed file and directory paths into the order os.walk would
+        list them in.  Lookups use it since refresh adds new entries to the
+        end of the indexes.
+        """
+        if self._walk_order is None:
+            self._walk_order = {}
+            stack = [self._root_directory]
+            while stack:
+                Path = stack.pop()
+                Record = self._directories.get(Path)
+                if Record is not None:
+                    self._walk_order[Path] = len(self._walk_order)
+                    stack.extend(os.path.join(Path, Name)
+                                 for Name in reversed(Record[1]))
+        Parents = {}
+        for FullPath in full_paths:
+            Parents.setdefault(os.path.dirname(FullPath), set()).add(
+                os.path.basename(FullPath))
+        ordered = []
+        # The root's own entry has no listed parent and comes first
+        for Path in sorted(Parents, key=lambda Path:
+                           self._walk_order.get(Path, -1)):
+            Record = self._directories.get(Path)
+            if Record is None:
+                ordered.extend(os.path.join(Path, Name)
+                               for Name in sorted(Parents[Path]))
+                continue
+            ordered.extend(os.path.join(Path, Name)
+                           for Names in Record[1:]
+                           for Name in Names if Name in Parents[Path])
+        return ordered
+
+    def directory_record(self, directory):
+        """
+        Returns an AttrDict with the mtime_ns, sub_directories and files of an
+        indexed directory, None if it is not in the index.
+        """
+        Record = self._directories.get(os.path.abspath(directory))
+        if Record is None:
+            return None
+        return AttrDict(mtime_ns=Record[0], sub_directories=list(Record[1]),
+                        files=list(Record[2]))
+
+    def walk(self):
+        """
+        Same (path, sub_directories, files) tuples os.walk gives, top down,
+        from the index.
+        """
+        stack = [self._root_directory]
+        while stack:
+            Path = stack.pop()
+            Record = self._directories.get(Path)
+            if Record is None:
+                continue
+            yield Path, list(Record[1]), list(Record[2])
+            stack.extend(os.path.join(Path, Name)
+                         for Name in reversed(Record[1]))
+
+    @staticmethod
+    def _stat_mtime_ns(Path):
+        try:
+            return os.stat(Path).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def _list_directory(Path):
+        sub_directories = []
+        files = []
+        followed = []
+        try:
+            with os.scandir(Path) as Entries:
+                for Entry in Entries:
+                    try:
+                        if Entry.is_dir():
+                            sub_directories.append(Entry.name)
+                            # Like os.walk, links to directories are listed
+                            # but not followed
+                            if not Entry.is_symlink():
+                                followed.append((Entry.path,
+                                                 Entry.stat().st_mtime_ns))
+                        else:
+                            files.append(Entry.name)
+                    except OSError:
+                        files.append(Entry.name)
+        except OSError:
+            # Unreadable, skipped the same way os.walk skips it
+            return None
+        return tuple(sub_directories), tuple(files), followed
+
+    def _descend_into(self, Path):
+        if self._exclude and any(fnmatch(os.path.basename(Path), Pattern)
+                                 for Pattern in self._exclude):
+            return False
+        if self._max_depth is not None:
+            Depth = os.path.relpath(Path, self._root_directory).count(
+                os.sep) + 1
+            return Depth <= self._max_depth
+        return True
+
+    def _merge_listing(self, Path, mtime_ns, Listing, callback):
+        if Listing is None:
+            return []
+        sub_directories, files, followed = Listing
+        self._directories[Path] = (mtime_ns, sub_directories, files)
+        self._walk_order = None
+        self._watch_directory(Path)
+        for Name in sub_directories:
+            self._index_entry(self._directory_name_index, Name,
+                              os.path.join(Path, Name))
+        for Name in files:
+            self._index_file(Path, Name)
+        if callback is not None:
+            callback(Path, list(sub_directories), list(files))
+        return [Child for Child in followed if self._descend_into(Child[0])]
+
+    def _add_directories(self, pending, callback=None):
+        if self._max_workers == 1:
+            stack = list(reversed(pending))
+            while stack:
+                Path, mtime_ns = stack.pop()
+                stack.extend(reversed(self._merge_listing(
+                    Path, mtime_ns, self._list_directory(Path), callback)))
+            return
+
+        # Listings run on the pool, merging stays on this thread so the
+        # index needs no locking.  A directory's children are all submitted
+        # as soon as it is merged but they are merged in os.walk order, so
+        # the index comes out the same whichever listing finishes first
+        with ThreadPoolExecutor(self._max_workers) as Pool:
+            stack = [(Pool.submit(self._list_directory, Path), Path, mtime_ns)
+                     for Path, mtime_ns in pending]
+            stack.reverse()
+            while stack:
+                Future, Path, mtime_ns = stack.pop()
+                Submitted = [(Pool.submit(self._list_directory, Child[0]),
+                              Child[0], Child[1])
+                             for Child in self._merge_listing(
+                                 Path, mtime_ns, Future.result(), callback)]
+                stack.extend(reversed(Submitted))
+
+    def _update_directory(self, Path, mtime_ns, callback=None):
+        Listing = self._list_directory(Path)
+        if Listing is None:
+            self._remove_directory(Path)
+            return
+        sub_directories, files, followed = Listing
+        Old = self._directories[Path]
+        for Name in set(Old[2]).difference(files):
+            self._unindex_file(Path, Name)
+        for Name in files:
+            if Name not in Old[2]:
+                self._index_file(Path, Name)
+        for Name in set(Old[1]).difference(sub_directories):
+            self._remove_directory(os.path.join(Path, Name))
+        for Name in sub_directories:
+            if Name not in Old[1]:
+                self._index_entry(self._directory_name_index, Name,
+                                  os.path.join(Path, Name))
+        self._directories[Path] = (mtime_ns, sub_directories, files)
+        self._walk_order = None
+        if callback is not None:
+            callback(Path, list(sub_directories), list(files))
+        self._add_directories([Child for Child in followed
+                               if Child[0] not in self._directories and
+                               self._descend_into(Child[0])], callback)
+
+    def _watch_directory(self, Path):
+        if self._watcher is not None:
+            try:
+                self._watcher.add(Path)
+            except OSError:
+                # Out of watches, back to stat'ing everything
+                self.stop_watching()
+
+    def _load_directories(self, directories):
+        self.clear()
+        self._index_entry(self._directory_name_index,
+                          os.path.basename(self._root_directory),
+                          self._root_directory)
+        self._walk_order = None
+        for Path, Record in directories.items():
+            self._directories[Path] = Record
+            self._watch_directory(Path)
+            for Name in Record[1]:
+                self._index_entry(self._directory_name_index, Name,
+                                  os.path.join(Path, Name))
+            for Name in Record[2]:
+                self._index_file(Path, Name)
+
+    def _remove_directory(self, Path):
+        # A directory's name is indexed by the listing of its parent
+        self._walk_order = None
+        self._unindex_entry(self._directory_name_index,
+                            os.path.basename(Path), Path)
+        stack = [Path]
+        while stack:
+            Path = stack.pop()
+            Record = self._directories.pop(Path, None)
+            if Record is None:
+                continue
+            if self._watcher is not None:
+                self._watcher.remove(Path)
+            for Name in Record[1]:
+                self._unindex_entry(self._directory_name_index, Name,
+                                    os.path.join(Path, Name))
+                stack.append(os.path.join(Path, Name))
+            for Name in Record[2]:
+                self._unindex_file(Path, Name)
+
+    def _index_file(self, Path, Name):
+        FullPath = os.path.join(Path, Name)
+        Dot = Name.rfind('.')
+        self._index_entry(self._extension_index,
+                          Name[Dot:] if Dot >= 0 else '', FullPath)
+        self._index_entry(self._file_name_index, Name, FullPath)
+
+    def _unindex_file(self, Path, Name):
+        FullPath = os.path.join(Path, Name)
+        Dot = Name.rfind('.')
+        self._unindex_entry(self._extension_index,
+                            Name[Dot:] if Dot >= 0 else '', FullPath)
+        self._unindex_entry(self._file_name_index, Name, FullPath)
+
+    @staticmethod
+    def _index_entry(index, key, FullPath):
+        # The values are dicts used as insertion ordered sets
+        index.setdefault(key, {})[FullPath] = None
+
+    @staticmethod
+    def _unindex_entry(index, key, FullPath):
+        Paths = index.get(key)
+        if Paths is not None:
+            Paths.pop(FullPath, None)
+            if not Paths:
+                del index[key]
+
+
 class FileSystemNavigation(object):
     """
     This is a class that helps the user navigate the file system for files
     and paths
     """
-    def __init__(self):
+    def __init__(self, snapshot_file=None, watch=False):
         """
         This is the class init.
 
@@ -885,7 +3003,16 @@ class FileSystemNavigation(object):
         Parameters
         ----------
 
-            None
+            snapshot_file : string (Path)
+                            Index snapshot of the current working directory.
+                            When given the lists are filled at startup from
+                            the snapshot, refreshed for whatever changed
+                            since it was saved.
+
+            watch : bool
+                    Keep the index up to date with inotify (Linux) so
+                    later get_folder_information calls only look at the
+                    directories that changed.
 
         Returns
         -------
@@ -902,12 +3029,21 @@ class FileSystemNavigation(object):
                                       the current directory and all the
                                       subdirectories
 
+            file_system_index : FileSystemIndex
+                                Index the lookups are answered from once
+                                get_folder_information has run
+
         """
         self._initialization_directory = os.getcwd()
         self._current_working_directory = os.getcwd()
         self._current_sub_directory_list = []
         self._current_file_list = []
         self._current_full_path_names = []
+        self._file_system_index = None
+        self._snapshot_file = snapshot_file
+        self._watch = watch
+        if snapshot_file is not None:
+            self.get_folder_information()
 
     @property
     def current_sub_directory_list(self):
@@ -915,6 +3051,8 @@ class FileSystemNavigation(object):
 
     @current_sub_directory_list.setter
     def current_sub_directory_list(self, new_sub_directory_list):
+        # Lists set by hand no longer match the index
+        self._drop_file_system_index()
         self._current_sub_directory_list = new_sub_directory_list
 
     @current_sub_directory_list.deleter
@@ -927,6 +3065,7 @@ class FileSystemNavigation(object):
 
     @current_file_list.setter
     def current_file_list(self, new_current_file_list):
+        self._drop_file_system_index()
         self._current_file_list = new_current_file_list
 
     @current_file_list.deleter
@@ -939,6 +3078,7 @@ class FileSystemNavigation(object):
 
     @current_full_path_names.setter
     def current_full_path_names(self, new_full_path_names_list):
+        self._drop_file_system_index()
         self._current_full_path_names = new_full_path_names_list
 
     @current_full_path_names.deleter
@@ -958,14 +3098,59 @@ class FileSystemNavigation(object):
     def current_working_directory(self):
         del self._current_working_directory
 
-    def get_folder_information(self):
+    @property
+    def file_system_index(self):
+        return self._file_system_index
+
+    def _drop_file_system_index(self):
+        # Closes the inotify descriptor (and with it every watch) of a
+        # watched index, the watcher is polled and runs no thread
+        if self._file_system_index is not None:
+            self._file_system_index.stop_watching()
+            self._file_system_index = None
+
+    def get_folder_information(self, max_workers=8, max_depth=None,
+                               exclude=None, snapshot_file=None):
+        """
+        Indexes the current working directory (see FileSystemIndex for
+        max_workers, max_depth and exclude) and fills the directory and file
+        lists.  Later calls only list directories that changed.
+
+        With snapshot_file (defaults to the one given at init) the listings
+        are saved after the crawl, and a fresh FileSystemNavigation starts
+        from the saved listings and only refreshes them.
+        """
+        if snapshot_file is None:
+            snapshot_file = self._snapshot_file
         self._current_working_directory = os.getcwd()
         all_sub_directories_relative_path = []
         all_files_relative_path = []
         all_full_path_names = []
 
-        for CwdPath, SubDirectories, Files \
-                in os.walk(self._current_working_directory):
+        # Only directories that changed since the last call are listed again
+        Index = self._file_system_index
+        if Index is None or \
+                Index.root_directory != self._current_working_directory or \
+                Index.max_depth != max_depth or \
+                Index.exclude != tuple(exclude or ()):
+            self._drop_file_system_index()
+            Index = FileSystemIndex(self._current_working_directory,
+                                    build=False, max_workers=max_workers,
+                                    max_depth=max_depth, exclude=exclude)
+            if snapshot_file is not None and \
+                    Index.load_snapshot(snapshot_file):
+                Index.refresh()
+            else:
+                Index.build()
+            if self._watch:
+                Index.watch()
+            self._file_system_index = Index
+        else:
+            Index.refresh()
+        if snapshot_file is not None:
+            Index.save_snapshot(snapshot_file)
+
+        for CwdPath, SubDirectories, Files in Index.walk():
             all_sub_directories_relative_path.append(SubDirectories)
             all_files_relative_path.append(Files)
             all_full_path_names.append(CwdPath)
@@ -975,6 +3160,11 @@ class FileSystemNavigation(object):
         self._current_full_path_names = all_full_path_names
 
     def find_files_with_extension(self, file_extension):
+        if self._file_system_index is not None:
+            return [os.path.basename(FullPath)[:-len(file_extension)]
+                    for FullPath in
+                    self._file_system_index.files_with_extension(
+                        file_extension)]
         file_list = []
         for DirectoryFiles in self._current_file_list:
             for Files in DirectoryFiles:
@@ -984,6 +3174,18 @@ class FileSystemNavigation(object):
         return file_list
 
     def verify_directory_exists(self, directory_names):
+        if isinstance(directory_names, str):
+            directory_names = [directory_names]
+        if self._file_system_index is not None:
+            Index = self._file_system_index
+            # The root is not a sub directory of anything
+            return [os.path.basename(FullPath) for FullPath
+                    in Index.in_walk_order(
+                        [FullPath for Directory
+                         in self.return_unique_entries(directory_names)
+                         for FullPath in Index.directories_named(Directory)
+                         if os.path.basename(FullPath) == Directory])
+                    if FullPath != Index.root_directory]
         directory_list = []
         for Directories in self._current_sub_directory_list:
             for Directory in Directories:
@@ -992,6 +3194,16 @@ class FileSystemNavigation(object):
         return directory_list
 
     def return_full_path_to_directory(self, directory_names):
+        if isinstance(directory_names, str):
+            directory_names = [directory_names]
+        if self._file_system_index is not None:
+            # Only directories os.walk would have visited
+            return [FullPath for Directory
+                    in self.return_unique_entries(directory_names)
+                    for FullPath
+                    in self._file_system_index.directories_named(Directory)
+                    if self._file_system_index.directory_record(FullPath)
+                    is not None]
         directory_list_full_path = []
         for Directory in self.return_unique_entries(directory_names):
                 for FullPathName in self._current_full_path_names:
@@ -1018,49 +3230,292 @@ class FileSystemNavigation(object):
         return list(set(non_unique_list))
 
 # Required imports if put in sepatate package
+# import os
+# import datetime
+# import xlsxwriter
 # import pandas as pd
+
+
+class ExcelWriterSession(object):
+    """
+    This is a workbook that stays open while any number of DataFrames are
+    written to any number of sheets, and is saved once when the session is
+    closed.
+
+    Rows are written straight through xlsxwriter in chunks.  In constant
+    memory mode (the default) xlsxwriter flushes each row to disk as soon as
+    the next one starts, so even very long phase vs time tables never sit in
+    memory as cells.  The price is that each sheet has to be written top to
+    bottom: a frame can go below what is already on a sheet but not above it.
+
+    Parameters
+    ----------
+    file_path : string (Path)
+                Folder of the workbook, or the full file name if file_name is
+                not given.
+    file_name : string
+                Name of the workbook.
+    constant_memory : bool
+                      Stream rows to disk as they are written.
+    datetime_format : string
+                      Excel number format used for dates and datetimes.
+    chunk_size : int
+                 Rows converted from the DataFrame at a time.
+    width_sample_size : int
+                        Rows of text columns measured for the column widths
+                        (see ExcelHandler.column_widths).
+
+    Example
+    -------
+
+    >>> with ExcelWriterSession('Z:\\Results', 'Phase.xlsx') as xl_session:
+    ...     xl_session.write_frame(reduced_set_df, 'Reduced', start_row=1,
+    ...                            start_column=1)
+    ...     xl_session.write_frame(cumulative_phase_df, 'All_Frequencies')
+    ...     xl_session.write_frame(summary_df, 'Reduced')
+    """
+
+    def __init__(self, file_path, file_name=None, constant_memory=True,
+                 datetime_format='mmm dd yyyy', chunk_size=10000,
+                 width_sample_size=10000):
+        if file_name is not None:
+            file_path = os.path.join(file_path, file_name)
+        self._file_name = file_path
+        self._constant_memory = constant_memory
+        self._chunk_size = chunk_size
+        self._width_sample_size = width_sample_size
+        self._workbook = xlsxwriter.Workbook(
+            file_path, {'constant_memory': constant_memory,
+                        'default_date_format': datetime_format,
+                        'nan_inf_to_errors': True})
+        # Same look pandas gives the header and index cells
+        self._header_format = self._workbook.add_format(
+            {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        self._index_format = self._workbook.add_format(
+            {'bold': True, 'border': 1, 'valign': 'top'})
+        self._index_datetime_format = self._workbook.add_format(
+            {'bold': True, 'border': 1, 'valign': 'top',
+             'num_format': datetime_format})
+        self._worksheets = {}
+        self._next_rows = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def file_name(self):
+        return self._file_name
+
+    @property
+    def workbook(self):
+        return self._workbook
+
+    def worksheet(self, sheet_name):
+        """
+        Returns the xlsxwriter worksheet, adding it if it does not exist yet.
+        """
+        if sheet_name not in self._worksheets:
+            self._worksheets[sheet_name] = \
+                self._workbook.add_worksheet(sheet_name)
+            self._next_rows[sheet_name] = 0
+        return self._worksheets[sheet_name]
+
+    def next_row(self, sheet_name):
+        """
+        First row below everything written to the sheet so far.
+        """
+        return self._next_rows.get(sheet_name, 0)
+
+    def write_frame(self, pdf, sheet_name, start_row=None, start_column=0,
+                    header=True, index=True, index_label=None,
+                    column_widths=True):
+        """
+        Writes a DataFrame laid out the way DataFrame.to_excel lays it out.
+
+        Parameters
+        ----------
+        pdf : DataFrame
+        sheet_name : string
+        start_row : int
+                    Defaults to the first free row of the sheet.
+        start_column : int
+        header : bool
+                 Write the column names.
+        index : bool
+                Write the index (one column per level).
+        index_label : string or list of string
+                      Header of the index columns, the index names if None.
+        column_widths : bool
+                        Size the data columns to their contents.
+
+        Returns
+        -------
+        The first row below the frame.
+        """
+        Worksheet = self.worksheet(sheet_name)
+        if start_row is None:
+            start_row = self._next_rows[sheet_name]
+        elif self._constant_memory and \
+                start_row < self._next_rows[sheet_name]:
+            raise ValueError('Rows up to {} of sheet {} are already written, '
+                             'a constant memory session writes each sheet '
+                             'top to bottom'.format(
+                                 self._next_rows[sheet_name] - 1, sheet_name))
+
+        IndexColumns = pdf.index.nlevels if index else 0
+        DataColumn = start_column + IndexColumns
+        Row = start_row
+        if header:
+            if index:
+                if index_label is None:
+                    Labels = list(pdf.index.names)
+                elif isinstance(index_label, (list, tuple)):
+                    Labels = list(index_label)
+                else:
+                    Labels = [index_label]
+                for Offset, Label in enumerate(Labels):
+                    if Label is not None:
+                        Worksheet.write(Row, start_column + Offset, Label,
+                                        self._header_format)
+            for Offset, Label in enumerate(pdf.columns):
+                if isinstance(Label, tuple):
+                    Label = ' '.join(str(Level) for Level in Label)
+                Worksheet.write(Row, DataColumn + Offset, Label,
+                                self._header_format)
+            Row += 1
+
+        for Start in range(0, len(pdf), self._chunk_size):
+            Chunk = pdf.iloc[Start:Start + self._chunk_size]
+            Values = Chunk.astype(object)
+            Values = Values.where(Values.notna(), None).values.tolist()
+            if index:
+                IndexValues = Chunk.index.to_frame(index=False).astype(object)
+                IndexValues = IndexValues.where(IndexValues.notna(),
+                                                None).values.tolist()
+            for Position, RowValues in enumerate(Values):
+                if index:
+                    for Offset, Value in enumerate(IndexValues[Position]):
+                        Worksheet.write(
+                            Row, start_column + Offset, Value,
+                            self._index_datetime_format
+                            if isinstance(Value, (datetime.date,
+                                                  datetime.time))
+                            else self._index_format)
+                Worksheet.write_row(Row, DataColumn, RowValues)
+                Row += 1
+
+        if column_widths:
+            for Offset, Width in enumerate(ExcelHandler.column_widths(
+                    pdf, self._width_sample_size, include_header=header)):
+                Worksheet.set_column(DataColumn + Offset,
+                                     DataColumn + Offset, Width)
+        self._next_rows[sheet_name] = max(self._next_rows[sheet_name], Row)
+        return Row
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+
+
+# Required imports if put in sepatate package
+# import os
+# import pandas as pd
+
+
 class ExcelHandler(object):
     def __init__(self):
         pass
 
     @staticmethod
     def save_to_excel(pdf, FILE_PATH, FILE_NAME, SHEET_NAME, START_COLUMN):
-        # CREATE AN EXCEL WRITER OBJECT SO I CAN WRITE ALL THE RESULTS TO A SINGLE FILE
-        WriterObj = pd.ExcelWriter(FILE_PATH +
-                                       '\\' +
-                                       FILE_NAME,
-                                   engine='xlsxwriter',
-                                   datetime_format='mmm dd yyyy',
-                                   date_format='mmm dd yyyy')
-
-        # WRITE THE RAW INFORMATION TO THE FILE
-        pdf.to_excel(WriterObj,
-                     SHEET_NAME,
-                     startrow=1,
-                     startcol=START_COLUMN,
-                     header=True,
-                     index=True,
-                     index_label='')
-
-        # FORMAT THE RESULTS THAT I WRITTEN INTO THE FILES
-        workbook = WriterObj.book
-        pdf_worksheet = WriterObj.sheets[SHEET_NAME]
-
-        # FORMAT THE SHEETS
+        # WRITE THE RAW INFORMATION TO THE FILE, FORMATTING THE COLUMN WIDTHS
+        # TO THE RESULTS
+        with ExcelWriterSession(FILE_PATH, FILE_NAME) as WriterObj:
+            WriterObj.write_frame(pdf,
+                                  SHEET_NAME,
+                                  start_row=1,
+                                  start_column=START_COLUMN,
+                                  header=True,
+                                  index=True,
+                                  index_label='')
+
+    @staticmethod
+    def column_widths(pdf, sample_size=10000, include_header=True,
+                      default_width=20, max_width=255):
+        """
+        Estimates the Excel column width (in characters) of every column of
+        a DataFrame without formatting every cell.
+
+        - integers : the longer of the minimum and maximum
+        - floats : longest of the values formatted with '{:.10g}', measured
+          over at most sample_size random rows plus the minimum and maximum
+        - dates : 11, the width of 'mmm dd yyyy'
+        - bools : 5
+        - categoricals : longest category in use
+        - strings (and anything else) : longest value, measured with the
+          vectorized str.len over at most sample_size random rows
+
+        Parameters
+        ----------
+        pdf : DataFrame
+        sample_size : int
+                      Rows of text and float columns measured, None for all
+                      of them.
+        include_header : bool
+                         Make room for the column name as well.
+        default_width : int
+                        Width of columns with nothing to measure (all NaN).
+        max_width : int
+                    Excel does not allow columns wider than 255.
+
+        Returns
+        -------
+        List of widths, one per column.
+        """
         columnwidths = []
-        columnwidths = [max(s)
-                        if str(max(s)) != 'nan' else 20
-                        for s in [pdf[value].astype('O').str.len()
-                        for index, value
-                            in enumerate(pdf.columns)]]
-
-        # ScheduleFileDataFrameExplicitWorksheet.set_row(2,None,format2)
-        for colnum in range(len(columnwidths)):
-            pdf_worksheet.set_column(
-                                     colnum +
-                                     START_COLUMN,
-                                     len(pdf.columns),
-                                     columnwidths[colnum])
-
-        # SAVE THE FILE
-        WriterObj.save()
+        for Position in range(pdf.shape[1]):
+            Width = ExcelHandler._data_width(pdf.iloc[:, Position],
+                                             sample_size)
+            if Width is None:
+                Width = default_width
+            if include_header:
+                Label = pdf.columns[Position]
+                if isinstance(Label, tuple):
+                    Label = ' '.join(str(Level) for Level in Label)
+                Width = max(Width, len(str(Label)))
+            columnwidths.append(min(int(Width), max_width))
+        return columnwidths
+
+    @staticmethod
+    def _data_width(Column, sample_size):
+        Column = Column.dropna()
+        if Column.empty:
+            return None
+        dtype = Column.dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            return 5
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return 11
+        if isinstance(dtype, pd.CategoricalDtype):
+            Categories = Column.cat.remove_unused_categories().cat.categories
+            return int(Categories.astype(str).str.len().max())
+        if pd.api.types.is_integer_dtype(dtype):
+            return max(len(str(Column.min())), len(str(Column.max())))
+        if pd.api.types.is_float_dtype(dtype):
+            # Values in between can need more digits than the extremes
+            # (-180.0, 12.3456789012, 180.0)
+            Values = Column.to_numpy(dtype=float)
+            if sample_size is not None and len(Values) > sample_size:
+                Values = np.append(
+                    Values[np.random.RandomState(0).randint(
+                        0, len(Values), sample_size)],
+                    (Values.min(), Values.max()))
+            return max(len('{:.10g}'.format(Value))
+                       for Value in np.unique(Values))
+        if sample_size is not None and len(Column) > sample_size:
+            Column = Column.sample(sample_size, random_state=0)
+        return int(Column.astype(str).str.len().max())
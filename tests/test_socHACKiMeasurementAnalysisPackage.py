@@ -0,0 +1,286 @@
+import numpy as np
+import pytest
+
+from socHACKi.socHACKiMeasurementAnalysisPackage import AgilentNAGroupDelay
+from socHACKi.socHACKiMeasurementAnalysisPackage import AgilentNALimitTest
+from socHACKi.socHACKiMeasurementAnalysisPackage import AgilentNAMarkerSearch
+from socHACKi.socHACKiMeasurementAnalysisPackage import AgilentNATraceMath
+from socHACKi.socHACKiMeasurementAnalysisPackage import PhaseStabilityAnalyzer
+
+
+LIMIT_TYPES = AgilentNALimitTest.AgilentNALimitTypeEnum
+SEARCH_TYPES = AgilentNAMarkerSearch.AgilentNAMarkerSearchTypeEnum
+TRACE_MATH = AgilentNATraceMath.AgilentNAMeasurementTraceMathEnum
+
+
+def make_limit_test():
+    # Upper limit slopes from -10 at 1 to -14 at 5, lower limit is a flat
+    # -30 from 2 to 4 and open everywhere else
+    return AgilentNALimitTest.from_segments(
+        [1, 2, 3, 4, 5],
+        [(LIMIT_TYPES.AgilentNALimitTypeMaximum, 1, 5, -10, -14),
+         (LIMIT_TYPES.AgilentNALimitTypeMinimum, 2, 4, -30, -30)])
+
+
+def test_limit_segments_compile_onto_the_grid():
+    limit_test = make_limit_test()
+    np.testing.assert_allclose(limit_test.upper_limit,
+                               [-10, -11, -12, -13, -14])
+    np.testing.assert_array_equal(limit_test.lower_limit,
+                                  [-np.inf, -30, -30, -30, -np.inf])
+    # Overlapping segments of one type keep the tightest limit
+    limit_test.add_segment(LIMIT_TYPES.AgilentNALimitTypeMaximum,
+                           5, 3, -13, -11)
+    np.testing.assert_allclose(limit_test.upper_limit,
+                               [-10, -11, -12, -13, -14])
+    limit_test.add_segment(LIMIT_TYPES.AgilentNALimitTypeMaximum,
+                           3, 5, -20, -20)
+    np.testing.assert_allclose(limit_test.upper_limit,
+                               [-10, -11, -20, -20, -20])
+    with pytest.raises(ValueError):
+        limit_test.add_segment(7, 1, 5, 0, 0)
+
+
+def test_limit_margins_and_first_failures():
+    traces = np.array([[-20, -20, -20, -20, -20],
+                       [-20, -20, -11, -20, -20],
+                       [-20, -35, -20, -20, -13.5]])
+    result = make_limit_test().evaluate(traces)
+    np.testing.assert_allclose(result.margin,
+                               [[10, 9, 8, 7, 6],
+                                [10, 9, -1, 7, 6],
+                                [10, -5, 8, 7, -0.5]])
+    np.testing.assert_allclose(result.worst_margin, [6, -1, -5])
+    np.testing.assert_array_equal(result.passed, [True, False, False])
+    np.testing.assert_array_equal(result.first_fail_point, [-1, 2, 1])
+    assert result.first_fail_sweep == 1
+
+
+def test_limit_batches_of_sweeps_and_traces():
+    limit_test = make_limit_test()
+    passing = np.full(5, -20.0)
+    failing = np.array([-20, -20, -11, -20, -20])
+    # time x frequency x trace, the second trace only fails in sweep 2
+    traces = np.stack([np.stack([passing, passing], axis=-1),
+                       np.stack([failing, passing], axis=-1),
+                       np.stack([passing, failing], axis=-1)])
+    result = limit_test.evaluate(traces, frequency_axis=1, sweep_axis=0)
+    assert result.margin.shape == (3, 5, 2)
+    np.testing.assert_array_equal(result.passed,
+                                  [[True, True], [False, True],
+                                   [True, False]])
+    np.testing.assert_array_equal(result.first_fail_point,
+                                  [[-1, -1], [2, -1], [-1, 2]])
+    np.testing.assert_array_equal(result.first_fail_sweep, [1, 2])
+    with pytest.raises(ValueError):
+        limit_test.evaluate(np.zeros((3, 4)))
+
+
+def test_marker_max_min_and_peak_searches():
+    marker_search = AgilentNAMarkerSearch([0, 10, 20, 30, 40, 50])
+    traces = np.array([[0, 2, 1, 5, 3, 4],
+                       [9, 1, 3, 2, 3, 0]])
+    result = marker_search.search(
+        traces, SEARCH_TYPES.AgilentNAMarkerSearchTypeMax)
+    np.testing.assert_array_equal(result.index, [3, 0])
+    np.testing.assert_array_equal(result.stimulus, [30, 0])
+    np.testing.assert_array_equal(result.response, [5, 9])
+    result = marker_search.search(
+        traces, SEARCH_TYPES.AgilentNAMarkerSearchTypeMin)
+    np.testing.assert_array_equal(result.index, [0, 5])
+    np.testing.assert_array_equal(result.response, [0, 0])
+
+    # End points are never peaks, so the 9 of the second trace is not one
+    result = marker_search.search(
+        traces, SEARCH_TYPES.AgilentNAMarkerSearchTypePeak)
+    np.testing.assert_array_equal(result.index, [3, 2])
+    result = marker_search.search(
+        traces, SEARCH_TYPES.AgilentNAMarkerSearchTypePeakLeft,
+        reference_index=[3, 4])
+    np.testing.assert_array_equal(result.index, [1, 2])
+    result = marker_search.search(
+        traces, SEARCH_TYPES.AgilentNAMarkerSearchTypePeakRight,
+        reference_index=3)
+    np.testing.assert_array_equal(result.index, [-1, 4])
+    np.testing.assert_array_equal(result.found, [False, True])
+    assert np.isnan(result.stimulus[0]) and result.stimulus[1] == 40
+    # Peaks have to stand out from both neighbours by the excursion
+    result = marker_search.search(
+        traces, SEARCH_TYPES.AgilentNAMarkerSearchTypePeak,
+        peak_excursion=1.5)
+    np.testing.assert_array_equal(result.index, [3, -1])
+    np.testing.assert_array_equal(result.found, [True, False])
+
+
+def test_marker_target_searches_interpolate():
+    marker_search = AgilentNAMarkerSearch([0, 10, 20, 30, 40, 50])
+    traces = np.array([[0, 4, 0, 4, 0, 4],
+                       [0, 2, 4, 6, 8, 10]], dtype=float)
+    result = marker_search.search(
+        traces, SEARCH_TYPES.AgilentNAMarkerSearchTypeTarget, target=3,
+        reference_index=2)
+    np.testing.assert_array_equal(result.index, [2, 1])
+    np.testing.assert_allclose(result.stimulus, [27.5, 15])
+    np.testing.assert_array_equal(result.response, [3, 3])
+    result = marker_search.search(
+        traces, SEARCH_TYPES.AgilentNAMarkerSearchTypeTargetLeft, target=3,
+        reference_index=2)
+    np.testing.assert_array_equal(result.index, [1, 1])
+    np.testing.assert_allclose(result.stimulus, [12.5, 15])
+    result = marker_search.search(
+        traces, SEARCH_TYPES.AgilentNAMarkerSearchTypeTargetRight, target=3,
+        reference_index=2)
+    np.testing.assert_array_equal(result.index, [2, -1])
+    np.testing.assert_allclose(result.stimulus, [27.5, np.nan])
+
+
+def test_marker_target_not_found():
+    marker_search = AgilentNAMarkerSearch([0, 10, 20])
+    result = marker_search.search(
+        [[0, 1, 2], [5, 0, 5]],
+        SEARCH_TYPES.AgilentNAMarkerSearchTypeTarget, target=10)
+    np.testing.assert_array_equal(result.index, [-1, -1])
+    np.testing.assert_array_equal(result.found, [False, False])
+    assert np.isnan(result.stimulus).all()
+    assert np.isnan(result.response).all()
+    with pytest.raises(ValueError):
+        marker_search.search([0, 1, 2],
+                             SEARCH_TYPES.AgilentNAMarkerSearchTypeTarget)
+    with pytest.raises(ValueError):
+        marker_search.search([0, 1, 2], 99)
+
+
+def test_trace_math_against_memory():
+    trace_math = AgilentNATraceMath()
+    traces = np.array([[2, 4, 6, 8],
+                       [1, 1, 0, 1]])
+    with pytest.raises(ValueError):
+        trace_math.apply(traces, TRACE_MATH.AgilentNAMeasurementTraceMathAdded)
+    trace_math.memory = [1, 2, 0, 4]
+    np.testing.assert_array_equal(
+        trace_math.apply(traces, TRACE_MATH.AgilentNAMeasurementTraceMathNone),
+        traces)
+    np.testing.assert_array_equal(
+        trace_math.apply(traces,
+                         TRACE_MATH.AgilentNAMeasurementTraceMathAdded),
+        [[3, 6, 6, 12], [2, 3, 0, 5]])
+    np.testing.assert_array_equal(
+        trace_math.apply(traces,
+                         TRACE_MATH.AgilentNAMeasurementTraceMathSubtracted),
+        [[1, 2, 6, 4], [0, -1, 0, -3]])
+    np.testing.assert_array_equal(
+        trace_math.apply(traces,
+                         TRACE_MATH.AgilentNAMeasurementTraceMathMultiplied),
+        [[2, 8, 0, 32], [1, 2, 0, 4]])
+    with np.errstate(all='raise'):
+        # Division by a zero memory point is inf (or nan for 0 / 0) and
+        # must not warn or raise
+        divided = trace_math.apply(
+            traces, TRACE_MATH.AgilentNAMeasurementTraceMathDivided)
+    np.testing.assert_array_equal(divided,
+                                  [[2, 2, np.inf, 2], [1, 0.5, np.nan, 0.25]])
+    with pytest.raises(ValueError):
+        trace_math.apply(traces, 99)
+
+
+def test_trace_math_memory_follows_the_frequency_axis():
+    trace_math = AgilentNATraceMath()
+    trace_math.memory = [1, 2, 0, 4]
+    traces = np.array([[2, 4, 6, 8],
+                       [1, 1, 0, 1]])
+    np.testing.assert_array_equal(
+        trace_math.apply(traces.T,
+                         TRACE_MATH.AgilentNAMeasurementTraceMathSubtracted,
+                         frequency_axis=0),
+        [[1, 0], [2, -1], [6, 0], [4, -3]])
+
+
+@pytest.mark.parametrize('aperture_points', [1, 4, 5, 10])
+def test_linear_phase_has_a_constant_group_delay(aperture_points):
+    frequency = 1e9 + 1e6 * np.arange(11)
+    delay = 5e-9
+    # Two sweeps, the second one is 1 ns longer
+    phase = np.stack([30 - 360 * delay * frequency,
+                      30 - 360 * (delay + 1e-9) * frequency])
+    group_delay = AgilentNAGroupDelay(frequency, aperture_points)
+    np.testing.assert_allclose(group_delay.group_delay(phase),
+                               [[5e-9] * 11, [6e-9] * 11], rtol=1e-6)
+    np.testing.assert_allclose(group_delay.delay_drift(phase),
+                               [[0] * 11, [1e-9] * 11], atol=1e-15)
+    np.testing.assert_allclose(group_delay.electrical_delay(phase),
+                               [5e-9, 6e-9], rtol=1e-6)
+    np.testing.assert_allclose(
+        group_delay.electrical_length(phase[0], velocity_factor=0.5),
+        [5e-9 * AgilentNAGroupDelay.SPEED_OF_LIGHT * 0.5] * 11, rtol=1e-6)
+
+    radians = AgilentNAGroupDelay(frequency, aperture_points, 'radians')
+    np.testing.assert_allclose(radians.group_delay(np.radians(phase.T),
+                                                   frequency_axis=0),
+                               [[5e-9, 6e-9]] * 11, rtol=1e-6)
+
+
+def test_group_delay_aperture_slides_inward_at_the_edges():
+    # Phase of i ** 2 cycles at i Hz, the delay over [left, right] is
+    # -(right + left), and every point uses the full aperture of 4
+    points = np.arange(11)
+    group_delay = AgilentNAGroupDelay(points, aperture_points=4)
+    left = np.array([0, 0, 0, 1, 2, 3, 4, 5, 6, 6, 6])
+    np.testing.assert_allclose(group_delay.group_delay(360.0 * points ** 2),
+                               -(2 * left + 4))
+    for aperture_points in (0, 11):
+        with pytest.raises(ValueError):
+            AgilentNAGroupDelay(points, aperture_points)
+    with pytest.raises(ValueError):
+        AgilentNAGroupDelay(points, phase_units='deg')
+    with pytest.raises(ValueError):
+        group_delay.group_delay(np.zeros(10))
+
+
+@pytest.mark.parametrize('phase_units', ['degrees', 'radians'])
+def test_streamed_stability_matches_the_batch_computation(phase_units):
+    random_state = np.random.RandomState(0)
+    frequency = np.array([1e9, 2e9, 3e9])
+    # Random walk phase plus a linear drift, sampled every 5 seconds
+    time = 5.0 * np.arange(200)
+    phase = (np.cumsum(random_state.normal(size=(200, 3)), axis=0) +
+             np.outer(time, [0.01, -0.02, 0.03]))
+    factors = [1, 2, 4, 8, 16]
+
+    stability = PhaseStabilityAnalyzer(5, factors, frequency, phase_units)
+    for row in phase:
+        stability.update(row)
+    assert stability.sample_count == 200
+
+    tau, deviation = PhaseStabilityAnalyzer.allan_deviation_of(
+        phase, 5, factors, frequency, phase_units)
+    np.testing.assert_allclose(stability.tau, tau)
+    np.testing.assert_allclose(stability.allan_deviation, deviation,
+                               rtol=1e-9)
+    tau, deviation = PhaseStabilityAnalyzer.modified_allan_deviation_of(
+        phase, 5, factors, frequency, phase_units)
+    np.testing.assert_allclose(stability.tau, tau)
+    np.testing.assert_allclose(stability.modified_allan_deviation,
+                               deviation, rtol=1e-9)
+    np.testing.assert_allclose(stability.drift_rate,
+                               PhaseStabilityAnalyzer.drift_rate_of(phase,
+                                                                    time),
+                               rtol=1e-9)
+
+    # Feeding the same capture as one block gives the same answer
+    block = PhaseStabilityAnalyzer(5, factors, frequency, phase_units)
+    block.extend(phase)
+    np.testing.assert_allclose(block.allan_deviation,
+                               stability.allan_deviation)
+
+
+def test_stability_phase_units_are_validated():
+    with pytest.raises(ValueError):
+        PhaseStabilityAnalyzer(5, phase_units='deg')
+    stability = PhaseStabilityAnalyzer(5)
+    with pytest.raises(ValueError):
+        stability.phase_units = 'rad'
+    assert stability.phase_units == 'degrees'
+    with pytest.raises(ValueError):
+        PhaseStabilityAnalyzer.allan_deviation_of(np.zeros((8, 2)), 5,
+                                                  frequency=[1e9, 2e9],
+                                                  phase_units='deg')
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from socHACKi.socHACKiTypeConversionPackage import SKungFu, SKungFuPipeline
+
+
+def test_cell_indicies_defaults_to_nan_in_first_column():
+    dframe = pd.DataFrame({'a': ['hi', 'nan', np.nan, None],
+                           'b': ['hi', 'there', 'good', 'looking']})
+    assert SKungFu.PandasCellIndicies(dframe) == [1, 2, 3]
+    assert SKungFu.PandasCellIndicies(dframe, column_name='b',
+                                      string_value='THERE') == [1]
+    assert SKungFu.PandasCellIndicies(dframe, column_number=1,
+                                      string_value='bye') == []
+
+
+def test_cell_indicies_see_column_rename():
+    dframe = pd.DataFrame({'a': ['x', 'y', 'z'], 'b': ['z', 'y', 'x']})
+    assert SKungFu.PandasCellIndicies(dframe, column_name='a',
+                                      string_value='x') == [0]
+    SKungFu.DataFrameColumnRename(dframe, ['a', 'b'], ['b', 'a'])
+    assert SKungFu.PandasCellIndicies(dframe, column_name='a',
+                                      string_value='x') == [2]
+
+
+def test_cell_indicies_see_column_reassignment():
+    dframe = pd.DataFrame({'a': ['x', 'y', 'y']})
+    assert SKungFu.PandasCellIndicies(dframe, string_value='x') == [0]
+    dframe['a'] = ['y', 'x', 'x']
+    assert SKungFu.PandasCellIndicies(dframe, string_value='x') == [1, 2]
+
+
+def test_series_cell_indicies_see_cell_edit():
+    pseries = pd.Series(['a', 'b', 'c'])
+    assert SKungFu.PandasSeriesCellIndiciesBasedOnString(pseries, 'a') == [0]
+    pseries[1] = 'a'
+    assert SKungFu.PandasSeriesCellIndiciesBasedOnString(
+        pseries, 'A') == [0, 1]
+
+
+def test_search_index_is_reusable():
+    dframe = pd.DataFrame({'a': ['x', 'Y', 'x', np.nan]})
+    Index = SKungFu.PandasColumnSearchIndex(dframe, column_name='a')
+    assert SKungFu.PandasCellIndicies(dframe, string_value='x',
+                                      search_index=Index) == [0, 2]
+    assert SKungFu.PandasCellIndicies(dframe, string_value='y',
+                                      search_index=Index) == [1]
+    assert SKungFu.PandasCellIndicies(dframe, search_index=Index) == [3]
+
+
+def test_cell_indicies_for_values():
+    dframe = pd.DataFrame({'a': ['hi', 'nan', np.nan, np.nan],
+                           'b': ['hi', 'there', 'good', 'looking']})
+    assert SKungFu.PandasCellIndiciesForValues(
+        dframe, ['Hi', 'nan', 'bye', 'bye']) == (
+            {'Hi': [0], 'nan': [1, 2, 3]}, ['bye'])
+    assert SKungFu.PandasCellIndiciesForValues(
+        dframe, ['there', 'good'], column_name='b') == (
+            {'there': [1], 'good': [2]}, [])
+
+
+def test_cell_indicies_for_values_see_mutation():
+    dframe = pd.DataFrame({'CPN': ['CL-1', 'CL-2', 'CL-3']})
+    assert SKungFu.PandasCellIndiciesForValues(
+        dframe, ['CL-1', 'CL-4']) == ({'CL-1': [0]}, ['CL-4'])
+    dframe.loc[2, 'CPN'] = 'CL-4'
+    dframe['CPN'] = dframe['CPN'][::-1].to_numpy()
+    assert SKungFu.PandasCellIndiciesForValues(
+        dframe, ['CL-1', 'CL-4']) == ({'CL-1': [2], 'CL-4': [0]}, [])
+    SKungFu.PandasDropAndFormat(dframe, [0])
+    assert SKungFu.PandasCellIndiciesForValues(
+        dframe, ['CL-1', 'CL-4']) == ({'CL-1': [1]}, ['CL-4'])
+
+
+def test_pipeline_matches_step_by_step_helpers():
+    dframe = pd.DataFrame({'a': ['hi', 'nan', np.nan, 'x', 'y'],
+                           'b': ['hi', 'there', 'good', 'looking', 'hi'],
+                           'c': [1.0, 2.0, 3.0, 4.0, 1.0]})
+    Pipeline = (SKungFuPipeline()
+                .DropRowsContainingValueInColumn(column_name='b',
+                                                 string_value='there')
+                .DropRows([0])
+                .Cast({'c': int})
+                .RemoveDuplicates(subset=['c'])
+                .DropColumns(['a'])
+                .Rename({'b': 'Word'}))
+    Result = Pipeline.Run(dframe)
+    Expected = dframe.copy()
+    SKungFu.PandasDropRowsContainingValueInColumn(Expected, column_name='b',
+                                                  string_value='there')
+    SKungFu.PandasDropAndFormat(Expected, [0])
+    Expected['c'] = Expected['c'].astype(int)
+    Expected = Expected.drop_duplicates(subset=['c']).reset_index(drop=True)
+    SKungFu.PandasDropAndFormat(Expected, ['a'], columns=True)
+    Expected = Expected.rename(columns={'b': 'Word'})
+    pd.testing.assert_frame_equal(Result, Expected)
+    assert len(dframe) == 5
+    pd.testing.assert_frame_equal(Pipeline.Run(dframe), Result)
+
+
+def test_pipeline_drops_non_string_column_labels():
+    dframe = pd.DataFrame([[1, 2, 3]], columns=[1e9, 2e9, 3e9])
+    Result = SKungFuPipeline().DropColumns([2e9, 4e9]).Run(dframe)
+    assert list(Result.columns) == [1e9, 3e9]
+    dframe = pd.DataFrame([[1, 2, 3]], columns=[2, 0, 1])
+    Result = SKungFuPipeline().DropColumns([0]).Run(dframe)
+    assert list(Result.columns) == [2, 1]
+    Result = SKungFuPipeline().DropColumns([0], by_position=True).Run(dframe)
+    assert list(Result.columns) == [0, 1]
+
+
+def test_pipeline_rename_collision_raises():
+    dframe = pd.DataFrame({'a': [1], 'b': [2]})
+    with pytest.raises(ValueError):
+        SKungFuPipeline().Rename({'a': 'b'}).Run(dframe)
+    Result = SKungFuPipeline().Rename({'a': 'b', 'b': 'a'}).Run(dframe)
+    assert list(Result.columns) == ['b', 'a']
+    assert Result['a'].tolist() == [2]
+
+
+def test_pipeline_search_sees_mutation():
+    dframe = pd.DataFrame({'a': ['x', 'y', 'z']})
+    Pipeline = SKungFuPipeline().DropRowsContainingValueInColumn('x')
+    assert Pipeline.Run(dframe)['a'].tolist() == ['y', 'z']
+    dframe.loc[2, 'a'] = 'x'
+    assert Pipeline.Run(dframe)['a'].tolist() == ['y']
@@ -0,0 +1,312 @@
+import os
+import random
+import datetime
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from socHACKi.socHACKiUtilityPackage import AttrDict
+from socHACKi.socHACKiUtilityPackage import ExcelCache
+from socHACKi.socHACKiUtilityPackage import ExcelHandler
+from socHACKi.socHACKiUtilityPackage import ExcelWriterSession
+from socHACKi.socHACKiUtilityPackage import FileContentCache
+from socHACKi.socHACKiUtilityPackage import FileSystemIndex
+from socHACKi.socHACKiUtilityPackage import FileSystemNavigation
+from socHACKi.socHACKiUtilityPackage import HRBOMInformation
+from socHACKi.socHACKiUtilityPackage import PandasPrinter
+from socHACKi.socHACKiUtilityPackage import StringListCollector
+from socHACKi.socHACKiUtilityPackage import XMLMinidomNavigator
+
+
+def make_tree(root):
+    for Directory in ['top', 'y', 'y/z', 'x', 'x/w', 'x/w/v']:
+        os.makedirs(os.path.join(str(root), Directory), exist_ok=True)
+        for Name in ['a.txt', 'b.csv', 'c.txt']:
+            with open(os.path.join(str(root), Directory, Name), 'w'):
+                pass
+    return str(root)
+
+
+def walk_files(root, extension):
+    return [os.path.join(Path, Name)
+            for Path, SubDirectories, Files in os.walk(root)
+            for Name in Files if Name.endswith(extension)]
+
+
+def test_index_merges_listings_in_walk_order(tmp_path, monkeypatch):
+    root = make_tree(tmp_path)
+    list_directory = FileSystemIndex._list_directory
+
+    def slow_list_directory(Path):
+        # Finish the listings in a random order
+        time.sleep(random.random() * 0.02)
+        return list_directory(Path)
+
+    monkeypatch.setattr(FileSystemIndex, '_list_directory',
+                        staticmethod(slow_list_directory))
+    for _ in range(5):
+        file_index = FileSystemIndex(root, max_workers=8)
+        assert [Path for Path, _, _ in file_index.walk()] == \
+            [Path for Path, _, _ in os.walk(root)]
+        assert file_index.files_with_extension('.txt') == \
+            walk_files(root, '.txt')
+
+
+def list_navigation(navigation):
+    # The same lists without the index, answered by the plain loops
+    listed = FileSystemNavigation()
+    listed.current_sub_directory_list = navigation.current_sub_directory_list
+    listed.current_file_list = navigation.current_file_list
+    listed.current_full_path_names = navigation.current_full_path_names
+    return listed
+
+
+def test_verify_directory_exists_takes_a_name(tmp_path, monkeypatch):
+    for Directory in ['Results', 'b/Results', 'b/Data', 'a']:
+        os.makedirs(os.path.join(str(tmp_path), Directory))
+    monkeypatch.chdir(tmp_path)
+    navigation = FileSystemNavigation()
+    navigation.get_folder_information()
+    assert navigation.file_system_index is not None
+    listed = list_navigation(navigation)
+    assert navigation.verify_directory_exists('Results') == \
+        ['Results', 'Results']
+    assert listed.verify_directory_exists('Results') == ['Results', 'Results']
+    assert navigation.verify_directory_exists(['Data', 'Results', 'a']) == \
+        listed.verify_directory_exists(['Data', 'Results', 'a'])
+    assert navigation.verify_directory_exists('Res') == []
+    assert sorted(navigation.return_full_path_to_directory('Data')) == \
+        [os.path.join(os.getcwd(), 'b', 'Data')]
+
+
+def test_find_files_with_extension_in_walk_order(tmp_path, monkeypatch):
+    root = make_tree(tmp_path)
+    monkeypatch.chdir(root)
+    navigation = FileSystemNavigation()
+    navigation.get_folder_information()
+    listed = list_navigation(navigation)
+    assert navigation.find_files_with_extension('.txt') == \
+        listed.find_files_with_extension('.txt')
+    # Files added later are listed where os.walk finds them
+    for Directory in ['top', 'x/w']:
+        with open(os.path.join(root, Directory, 'new.txt'), 'w'):
+            pass
+    navigation.get_folder_information()
+    listed = list_navigation(navigation)
+    assert navigation.find_files_with_extension('.txt') == \
+        listed.find_files_with_extension('.txt')
+    assert navigation.file_system_index.files_with_extension('.txt') == \
+        walk_files(os.getcwd(), '.txt')
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'),
+                    reason='needs /proc to count descriptors')
+def test_rescans_close_the_previous_watcher(tmp_path, monkeypatch):
+    root = make_tree(tmp_path)
+    monkeypatch.chdir(root)
+    navigation = FileSystemNavigation(watch=True)
+    navigation.get_folder_information()
+    if not navigation.file_system_index.watching:
+        pytest.skip('inotify is not available')
+    Descriptors = len(os.listdir('/proc/self/fd'))
+    for max_depth in [1, 2, None, 1, 2, None]:
+        navigation.get_folder_information(max_depth=max_depth)
+        assert navigation.file_system_index.watching
+    assert len(os.listdir('/proc/self/fd')) == Descriptors
+    Index = navigation.file_system_index
+    navigation.current_file_list = []
+    assert not Index.watching
+    assert len(os.listdir('/proc/self/fd')) == Descriptors - 1
+
+
+def test_column_widths_measure_interior_floats():
+    pdf = pd.DataFrame({'Phase': [-180.0, 12.3456789012, 180.0, np.nan],
+                        'Count': [1, -200, 3, 4],
+                        'Name': ['a', 'abcdef', None, 'ab']})
+    assert ExcelHandler.column_widths(pdf, include_header=False) == \
+        [len('{:.10g}'.format(12.3456789012)), 4, 6]
+    Phase = pd.DataFrame({'Phase': np.round(
+        np.linspace(-180, 180, 50001), 4)})
+    assert ExcelHandler.column_widths(Phase, sample_size=100,
+                                      include_header=False) >= [9]
+
+
+@pytest.mark.parametrize('values', [
+    pd.Series([' a ', None, np.nan, 1, 1.0, True, -0.0, 0.0,
+               pd.Timestamp('2020-01-01'), datetime.datetime(2020, 1, 1),
+               pd.NaT], dtype=object),
+    pd.Series([1.0, np.nan, -0.0, 0.0]),
+    pd.Series(pd.to_datetime(['2020-01-01', None])),
+    pd.Series([1, None], dtype='Int64'),
+    pd.Series(['x', None, ' y ']),
+    [None, datetime.datetime(2020, 1, 1), ' z '],
+])
+def test_extend_stores_what_the_items_setter_stores(values):
+    extended = StringListCollector()
+    extended.extend(values)
+    assigned = StringListCollector()
+    for value in values:
+        assigned.items = value
+    assert extended.items == assigned.items
+
+
+@pytest.mark.parametrize('extension', ['.csv', '.xlsx'])
+def test_bom_blank_cells_are_not_duplicates(tmp_path, extension):
+    pdf = pd.DataFrame({'CPN': ['CL-001', 'CL-002', 'CL-001', None, None,
+                                'NA'],
+                        'Manufacturer_Part_Number': ['0603', None, '0603',
+                                                     '0402', None, 'X'],
+                        'BOM_Quantity_Units': ['LFT', None, 'EAC', None,
+                                               'EAC', 'EAC']})
+    file_name = str(tmp_path / ('bom' + extension))
+    bom = HRBOMInformation()
+    if extension == '.csv':
+        pdf.to_csv(file_name, index=False)
+        bom.load_csv(file_name)
+    else:
+        pdf.to_excel(file_name, index=False)
+        bom.load_excel(file_name)
+    assert bom.row_count == 6
+    assert bom.duplicates('CPN') == {'CL-001': [0, 2]}
+    assert bom.duplicates('Manufacturer_Part_Number') == {'0603': [0, 2]}
+    assert bom.find_rows('CPN', 'NA') == [5]
+    assert bom.find_rows('CPN', '') == [3, 4]
+    assert bom.row(1)['BOM_Quantity_Units'] == 'EAC'
+    assert bom.row(3)['CPN'] == ''
+
+
+def test_attr_dict_reads_return_the_stored_dict():
+    instance = AttrDict(a={'x': 1})
+    stored = instance['a']
+    assert instance.a is stored
+    assert isinstance(instance.a, dict)
+    assert json.loads(json.dumps(instance)) == {'a': {'x': 1}}
+    assert instance.a.copy() == {'x': 1}
+    assert instance.a.x == 1
+    instance.a.y = {'z': 2}
+    instance.update(b={'c': 3})
+    instance.setdefault('d', {'e': 4})
+    instance |= {'f': {'g': 5}}
+    assert (instance.a.y.z, instance.b.c, instance.d.e, instance.f.g) == \
+        (2, 3, 4, 5)
+    assert instance['a'] is stored
+    del instance.a.x
+    assert instance == {'a': {'y': {'z': 2}}, 'b': {'c': 3}, 'd': {'e': 4},
+                        'f': {'g': 5}}
+    with pytest.raises(AttributeError):
+        instance.a.missing
+
+
+def test_compiled_queries_are_bounded():
+    navigator = XMLMinidomNavigator(io.StringIO(
+        "<a><b id='1'>x</b><b id='2'>y</b></a>"))
+    assert navigator.query("//b[@id='2']/text()") == ['y']
+    assert navigator.query('/a/b[1]/@id') == ['1']
+    for position in range(1, 3000):
+        XMLMinidomNavigator.compile_query('//b[{}]'.format(position))
+    assert XMLMinidomNavigator.compile_query.cache_info().currsize <= 1024
+
+
+def test_navigator_opens_path_like_file_names(tmp_path):
+    xml_file = tmp_path / 'drawing.xml'
+    xml_file.write_text(
+        '<?xml version="1.0"?>\n<!DOCTYPE a>\n'
+        "<a><b id='1'>x</b><c><b>y</b></c></a>")
+    navigator = XMLMinidomNavigator(xml_file)
+    assert navigator._xml_dom_tree.doctype.name == 'a'
+    assert navigator.query('//b/@id') == ['1']
+    assert navigator.query('//c/b/text()') == ['y']
+
+
+def test_file_cache_manifest_drops_files_without_entries(tmp_path):
+    cache = FileContentCache(cache_directory=str(tmp_path / 'cache'),
+                             max_cache_size=10)
+    first, second = tmp_path / 'first.xlsx', tmp_path / 'second.xlsx'
+    first.write_bytes(b'first')
+    second.write_bytes(b'second')
+    cache.put(str(first), b'0123456789')
+    assert cache.get(str(first)) == b'0123456789'
+    # The second entry pushes the first one out and its file with it
+    cache.put(str(second), b'9876543210')
+    assert cache.get(str(first)) is None
+    cache.put(str(second), b'9876543210')
+    reopened = FileContentCache(cache_directory=str(tmp_path / 'cache'))
+    assert [os.path.basename(path) for path in reopened._manifest] == \
+        ['second.xlsx']
+    assert reopened.get(str(second)) == b'9876543210'
+
+
+def test_excel_cache_caches_path_like_file_names(tmp_path):
+    excel_file = tmp_path / 'bom.xlsx'
+    pd.DataFrame({'CPN': ['CL-001', 'CL-002']}).to_excel(excel_file,
+                                                         index=False)
+    cache = ExcelCache(cache_directory=str(tmp_path / 'cache'))
+    first = cache.read_excel(excel_file, dtype=str)
+    assert len(os.listdir(str(tmp_path / 'cache'))) == 2
+    pd.testing.assert_frame_equal(cache.read_excel(str(excel_file),
+                                                   dtype=str), first)
+
+
+def test_print_window_shows_head_and_tail_rows():
+    pdf = pd.DataFrame({'name': ['row{}'.format(Row) for Row in range(50)],
+                        'value': np.arange(50) * 1.5})
+    stream = io.StringIO()
+    PandasPrinter.pd_print_window(pdf, head=2, tail=1, stream=stream)
+    lines = stream.getvalue().splitlines()
+    rows = [line for line in lines if line.startswith('│')]
+    assert [row.split('│')[2].strip() for row in rows] == \
+        ['name', 'row0', 'row1', '⋮', 'row49']
+    assert rows[-1].split('│')[3].strip() == '73.5'
+    assert lines[-1] == '[50 rows x 2 columns]'
+    assert len(set(len(line) for line in lines[:-1])) == 1
+
+
+def test_print_window_sizes_columns_from_a_sample():
+    pdf = pd.DataFrame({'name': ['x'] * 5000})
+    pdf.loc[1234, 'name'] = 'a much longer cell'
+    stream = io.StringIO()
+    PandasPrinter.pd_print_window(pdf, head=None, stream=stream,
+                                  sample_size=100)
+    rows = [line for line in stream.getvalue().splitlines()
+            if line.startswith('│')]
+    assert len(rows) == 5001
+    # The long cell was not in the sample, so it is cut to the sampled width
+    assert rows[1235].split('│')[2].strip() == 'a m…'
+    assert len(set(len(row) for row in rows)) == 1
+
+
+def test_constant_memory_session_round_trips_frames(tmp_path):
+    phase = pd.DataFrame(
+        {1000000000: np.arange(25000) * 0.25,
+         2000000000: -np.arange(25000) * 0.5},
+        index=pd.Index(np.arange(25000) * 5, name='time'))
+    phase.iloc[3, 1] = np.nan
+    parts = pd.DataFrame(
+        {'CPN': ['CL-001', 'CL-002'],
+         'Date': pd.to_datetime(['2024-01-02', '2024-03-04'])})
+    with ExcelWriterSession(str(tmp_path), 'phase.xlsx',
+                            chunk_size=1000) as session:
+        assert session.write_frame(phase, 'Phase') == 25001
+        session.write_frame(parts, 'Parts', index=False)
+        session.write_frame(parts, 'Parts', start_row=4, index=False)
+        with pytest.raises(ValueError):
+            session.write_frame(parts, 'Parts', start_row=0)
+
+    read_back = pd.read_excel(str(tmp_path / 'phase.xlsx'),
+                              sheet_name=None, index_col=None)
+    pd.testing.assert_frame_equal(read_back['Phase'].set_index('time'),
+                                  phase, check_names=False,
+                                  check_dtype=False,
+                                  check_column_type=False)
+    assert read_back['Phase'].columns[0] == 'time'
+    pd.testing.assert_frame_equal(read_back['Parts'].iloc[:2], parts,
+                                  check_dtype=False)
+    assert read_back['Parts'].iloc[3].tolist() == ['CPN', 'Date']
+    pd.testing.assert_frame_equal(
+        read_back['Parts'].iloc[4:].reset_index(drop=True).astype(
+            {'Date': 'datetime64[ns]'}),
+        parts, check_dtype=False)